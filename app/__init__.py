@@ -5,20 +5,41 @@ Este módulo configura todas as extensões necessárias, gerencia o ciclo
 de vida da aplicação e registra blueprints e handlers de erro.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, current_app, request
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_restful import Api
 import click
+import json
 import os
+from functools import lru_cache
+
+from app.utils.compression import GzipMiddleware
+from app.utils.cors import CORSMiddleware
 
 # Inicializar extensões globais
 db = SQLAlchemy()  # ORM para banco de dados
 migrate = Migrate()  # Gerenciamento de migrações do banco de dados
 jwt = JWTManager()  # Gerenciamento de autenticação JWT
 
+_models_imported = False  # Ver _import_models()
+
+# Corpos JSON pré-serializados das respostas de erro JWT.
+# Apenas 'error_details' varia por requisição e é concatenado ao prefixo já serializado.
+_JWT_EXPIRED_BODY = json.dumps({
+    'error': 'Token expirado',
+    'description': 'O token fornecido expirou'
+}).encode()
+_JWT_INVALID_PREFIX = json.dumps({
+    'error': 'Token inválido',
+    'description': 'O token fornecido é inválido'
+})[:-1].encode() + b', "error_details": '
+_JWT_MISSING_PREFIX = json.dumps({
+    'error': 'Token ausente',
+    'description': 'Token de autorização não fornecido'
+})[:-1].encode() + b', "error_details": '
+
 
 def create_app(config=None):
     """
@@ -38,11 +59,16 @@ def create_app(config=None):
     # Inicializar extensões com a aplicação
     _initialize_extensions(app)
     
-    # Configurar handlers de erro JWT
-    _configure_jwt_handlers(app)
+    # Comprimir com gzip as respostas JSON grandes (middleware WSGI, dentro do CORS)
+    if app.config.get('COMPRESS_ENABLED', True):
+        app.wsgi_app = GzipMiddleware(
+            app.wsgi_app,
+            level=app.config.get('COMPRESS_LEVEL', 6),
+            min_size=app.config.get('COMPRESS_MIN_SIZE', 500),
+        )
     
-    # Configurar CORS para acesso de origens permitidas
-    _configure_cors(app)
+    # Configurar CORS para acesso de origens permitidas (middleware WSGI)
+    app.wsgi_app = CORSMiddleware(app.wsgi_app, app.config.get('CORS_ORIGINS', '*'))
     
     # Configurar endpoint de health check
     _register_health_check(app)
@@ -56,6 +82,9 @@ def create_app(config=None):
     # Registrar comandos CLI
     _register_commands(app)
     
+    # Compilar o mapa de URLs agora (com preload_app no Gunicorn, isso ocorre uma vez no master)
+    app.url_map.update()
+    
     return app
 
 
@@ -67,11 +96,10 @@ def _configure_app(app, config):
         app: Instância da aplicação Flask
         config: Objeto de configuração ou None
     """
-    if config:
-        app.config.from_object(config)
-    else:
+    if not config:
         from config import get_config
-        app.config.from_object(get_config())
+        config = get_config()
+    app.config.update(_config_dict(config))
     
     # Configurações específicas do JWT
     app.config['JWT_IDENTITY_CLAIM'] = 'sub'
@@ -80,11 +108,27 @@ def _configure_app(app, config):
     app.config['JWT_HEADER_NAME'] = 'Authorization'
     app.config['JWT_HEADER_TYPE'] = 'Bearer'
     
-    # Garantir que o diretório de uploads exista
-    upload_folder = app.config.get('UPLOAD_FOLDER')
-    if upload_folder:
-        os.makedirs(os.path.join(upload_folder, 'documents'), exist_ok=True)
-        os.makedirs(os.path.join(upload_folder, 'communications'), exist_ok=True)
+    # Serialização JSON (jsonify, request.get_json) via orjson
+    from app.utils.serialization import ORJSONProvider
+    app.json = ORJSONProvider(app)
+    
+    # Os diretórios de upload são criados no primeiro upload (ver app.utils.uploads)
+
+
+@lru_cache(maxsize=None)
+def _config_dict(config):
+    """
+    Extrai (uma única vez por processo) as chaves em maiúsculas do objeto de configuração.
+    
+    Equivalente a app.config.from_object(config), sem repetir a reflexão a cada create_app.
+    
+    Args:
+        config: Classe ou objeto de configuração
+    
+    Returns:
+        dict: Configurações em maiúsculas e seus valores
+    """
+    return {key: getattr(config, key) for key in dir(config) if key.isupper()}
 
 
 def _initialize_extensions(app):
@@ -95,52 +139,58 @@ def _initialize_extensions(app):
         app: Instância da aplicação Flask
     """
     db.init_app(app)
+    _import_models()
     migrate.init_app(app, db)
     jwt.init_app(app)
 
 
-def _configure_cors(app):
+def _import_models():
     """
-    Configura o CORS (Cross-Origin Resource Sharing) para a aplicação.
-    
-    Args:
-        app: Instância da aplicação Flask
+    Importa os modelos (uma única vez por processo) para que o Flask-Migrate os detecte.
     """
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
+    global _models_imported
+    if not _models_imported:
+        from app import models  # noqa: F401
+        _models_imported = True
 
 
-def _configure_jwt_handlers(app):
+def _jwt_error_response(body):
     """
-    Configura handlers personalizados para erros de autenticação JWT.
+    Cria a resposta 401 para erros de autenticação JWT a partir do corpo já serializado.
+    
+    Uma nova Response é criada a cada chamada, pois hooks after_request podem
+    alterar os cabeçalhos da resposta.
     
     Args:
-        app: Instância da aplicação Flask
+        body: Corpo JSON em bytes
     """
-    @jwt.expired_token_loader
-    def expired_token_callback(jwt_header, jwt_payload):
-        """Handler para tokens expirados"""
-        return jsonify({
-            'error': 'Token expirado',
-            'description': 'O token fornecido expirou'
-        }), 401
-
-    @jwt.invalid_token_loader
-    def invalid_token_callback(error):
-        """Handler para tokens inválidos"""
-        return jsonify({
-            'error': 'Token inválido',
-            'description': 'O token fornecido é inválido',
-            'error_details': str(error)
-        }), 401
-    
-    @jwt.unauthorized_loader
-    def missing_token_callback(error):
-        """Handler para ausência de token"""
-        return jsonify({
-            'error': 'Token ausente',
-            'description': 'Token de autorização não fornecido',
-            'error_details': str(error)
-        }), 401
+    return Response(body, status=401, mimetype='application/json')
+
+
+# Handlers personalizados para erros de autenticação JWT.
+# Registrados uma única vez no JWTManager global (não dependem da aplicação).
+
+@jwt.expired_token_loader
+def expired_token_callback(jwt_header, jwt_payload):
+    """Handler para tokens expirados"""
+    return _jwt_error_response(_JWT_EXPIRED_BODY)
+
+
+@jwt.invalid_token_loader
+def invalid_token_callback(error):
+    """Handler para tokens inválidos"""
+    return _jwt_error_response(_JWT_INVALID_PREFIX + json.dumps(str(error)).encode() + b'}')
+
+
+@jwt.unauthorized_loader
+def missing_token_callback(error):
+    """Handler para ausência de token"""
+    return _jwt_error_response(_JWT_MISSING_PREFIX + json.dumps(str(error)).encode() + b'}')
+
+
+def health_check():
+    """Endpoint para verificar se a API está funcionando"""
+    return {"status": "ok", "version": "1.0.0"}, 200
 
 
 def _register_health_check(app):
@@ -150,10 +200,7 @@ def _register_health_check(app):
     Args:
         app: Instância da aplicação Flask
     """
-    @app.route('/api/health', methods=['GET'])
-    def health_check():
-        """Endpoint para verificar se a API está funcionando"""
-        return {"status": "ok", "version": "1.0.0"}, 200
+    app.add_url_rule('/api/health', 'health_check', health_check, methods=('GET',))
 
 
 def _register_blueprints(app):
@@ -163,66 +210,38 @@ def _register_blueprints(app):
     Args:
         app: Instância da aplicação Flask
     """
-    with app.app_context():
-        # Importar modelos para garantir que o Flask-Migrate os detecte
-        from app.models import User, Customer, CustomField, CustomFieldValue, Lead
-        from app.models.pipeline import PipelineStage
-        from app.models.deal import Deal
-        
-        # Novos modelos implementados
-        from app.models import Task, Communication, Workflow, WorkflowAction, Document
-        
-        # API principal
-        from app.api import api_bp
-        app.register_blueprint(api_bp, url_prefix='/api')
-        
-        # Blueprints específicos (removendo example_bp)
-        # from app.api.example import example_bp 
-        # app.register_blueprint(example_bp, url_prefix='/api') 
-        
-        # Os blueprints de módulos já estão registrados dentro de api_bp
-        # Não é necessário registrá-los novamente aqui diretamente no app
-        # A linha app.register_blueprint(api_bp, url_prefix='/api') acima
-        # já registra todos os blueprints aninhados (auth, users, leads, etc.)
-        # sob o prefixo /api.
-        
-        # Remover registros individuais que estavam aqui, pois agora estão no api_bp
-        # from app.api.leads import bp as leads_bp
-        # app.register_blueprint(leads_bp, url_prefix='/api/leads')
-        # 
-        # from app.api.users import bp as users_bp
-        # app.register_blueprint(users_bp, url_prefix='/api/users')
-        # 
-        # from app.api.deals import bp as deals_bp
-        # app.register_blueprint(deals_bp, url_prefix='/api/deals')
-        
-        # Criar estágios padrão do pipeline para novos sistemas
-        # Esta chamada pode ser movida para o comando init-db se fizer mais sentido
-        # PipelineStage.create_default_stages() # Comentado para evitar erro antes da migração
+    # API principal (os módulos são importados sob demanda em create_api_blueprint)
+    from app.api import create_api_blueprint
+    app.register_blueprint(create_api_blueprint(), url_prefix='/api')
+
+
+def _not_found(error):
+    """Handler para recursos não encontrados"""
+    return {"error": "Not found", "path": request.path}, 404
+
+
+def _server_error(error):
+    """Handler para erros internos do servidor"""
+    current_app.logger.error(f"Erro interno do servidor: {str(error)}")
+    return {"error": "Server error", "details": str(error)}, 500
+
+
+def _unprocessable_entity(error):
+    """Handler para dados inválidos"""
+    return {"error": "Unprocessable Entity", "details": str(error)}, 422
 
 
 def _register_error_handlers(app):
     """
     Registra handlers para erros HTTP comuns.
     
+    Os handlers são funções de módulo, criadas uma única vez por processo.
+    
     Args:
         app: Instância da aplicação Flask
     """
-    @app.errorhandler(404)
-    def not_found(error):
-        """Handler para recursos não encontrados"""
-        return {"error": "Not found", "path": request.path}, 404
-    
-    @app.errorhandler(500)
-    def server_error(error):
-        """Handler para erros internos do servidor"""
-        app.logger.error(f"Erro interno do servidor: {str(error)}")
-        return {"error": "Server error", "details": str(error)}, 500
-    
-    @app.errorhandler(422)
-    def unprocessable_entity(error):
-        """Handler para dados inválidos"""
-        return {"error": "Unprocessable Entity", "details": str(error)}, 422
+    for code, handler in ((404, _not_found), (500, _server_error), (422, _unprocessable_entity)):
+        app.register_error_handler(code, handler)
 
 
 def _register_commands(app):
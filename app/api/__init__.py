@@ -1,32 +1,42 @@
+import importlib
+
 from flask import Blueprint
 
-api_bp = Blueprint('api', __name__)
+# Tabela de Blueprints dos módulos da API: (módulo, atributo, url_prefix).
+# Os módulos só são importados quando o blueprint é registrado, evitando carregar
+# modelos, schemas e rotas de todos os módulos em comandos CLI ou testes isolados.
+# Os prefixos são definidos apenas aqui; os Blueprints dos módulos não declaram url_prefix.
+BLUEPRINTS = [
+    ('app.api.auth', 'auth_bp', '/auth'),
+    ('app.api.users', 'bp', '/users'),
+    ('app.api.leads', 'bp', '/leads'),
+    ('app.api.deals', 'bp', '/deals'),
+    ('app.api.customers', 'customers_bp', '/customers'),
+    ('app.api.custom_fields', 'custom_fields_bp', '/custom-fields'),
+    ('app.api.pipeline', 'bp', '/pipeline'),
+    ('app.api.tasks', 'tasks_bp', '/tasks'),
+    ('app.api.communications', 'communications_bp', '/communications'),
+    ('app.api.workflows', 'workflows_bp', '/workflows'),
+    ('app.api.documents', 'documents_bp', '/documents'),
+]
+
+
+def create_api_blueprint(names=None):
+    """
+    Cria o Blueprint principal da API importando os módulos sob demanda.
 
-# Importar Blueprints dos seus respectivos módulos __init__
-from app.api.auth import auth_bp
-from app.api.users import bp as users_bp
-from app.api.leads import bp as leads_bp
-from app.api.deals import bp as deals_bp
-from app.api.customers import customers_bp
-from app.api.custom_fields import custom_fields_bp
-from app.api.pipeline import bp as pipeline_bp
-from app.api.tasks import tasks_bp
-from app.api.communications import communications_bp
-from app.api.workflows import workflows_bp
-from app.api.documents import documents_bp
+    Args:
+        names: Nomes dos módulos a registrar (ex: ['auth', 'leads']).
+            Se None, registra todos os módulos de BLUEPRINTS.
 
-# Registrar Blueprints no Blueprint principal da API com os respectivos url_prefix
-api_bp.register_blueprint(auth_bp, url_prefix='/auth')
-api_bp.register_blueprint(users_bp, url_prefix='/users')
-api_bp.register_blueprint(leads_bp, url_prefix='/leads')
-api_bp.register_blueprint(deals_bp, url_prefix='/deals')
-api_bp.register_blueprint(customers_bp, url_prefix='/customers')
-api_bp.register_blueprint(custom_fields_bp, url_prefix='/custom-fields')
-api_bp.register_blueprint(pipeline_bp, url_prefix='/pipeline')
-api_bp.register_blueprint(tasks_bp, url_prefix='/tasks')
-api_bp.register_blueprint(communications_bp, url_prefix='/communications')
-api_bp.register_blueprint(workflows_bp, url_prefix='/workflows')
-api_bp.register_blueprint(documents_bp, url_prefix='/documents')
+    Returns:
+        Blueprint: Blueprint 'api' com os blueprints dos módulos aninhados
+    """
+    api_bp = Blueprint('api', __name__)
+    for module_path, attr, url_prefix in BLUEPRINTS:
+        if names is not None and module_path.rsplit('.', 1)[-1] not in names:
+            continue
+        bp = getattr(importlib.import_module(module_path), attr)
+        api_bp.register_blueprint(bp, url_prefix=url_prefix)
+    return api_bp
 
-# Nota: Após esta modificação, todas as rotas terão seus prefixos corretamente configurados
-# Exemplo: /api/users/me, /api/leads/, /api/auth/login, etc.
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Respostas JSON de erro recorrentes das rotas da API ({'message': ...} com 400/403/404).
+
+Os corpos são serializados uma única vez, na importação; a cada requisição é criada
+apenas a Response, pois hooks (after_request) podem alterar os cabeçalhos da resposta.
+"""
+
+from flask import Response
+
+from app.utils.serialization import dumps
+
+# Mensagens compartilhadas por vários módulos
+PERMISSION_DENIED = 'Permissão negada'
+INVALID_CURSOR = 'Cursor de paginação inválido'
+
+_bodies = {}
+
+
+def message_response(message, status):
+    # Retorna a resposta {'message': message} com o status informado, reaproveitando o corpo serializado.
+    # 
+    # Args:
+    #     message (str): Mensagem fixa (não deve conter dados da requisição).
+    #     status (int): Código HTTP.
+    # 
+    # Returns:
+    #     Response: Resposta JSON.
+    body = _bodies.get(message)
+    if body is None:
+        body = _bodies[message] = dumps({'message': message})
+    return Response(body, status=status, mimetype='application/json')
+
+
+def not_found(message):
+    return message_response(message, 404)
+
+
+def bad_request(message):
+    return message_response(message, 400)
+
+
+def forbidden(message=PERMISSION_DENIED):
+    return message_response(message, 403)
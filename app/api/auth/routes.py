@@ -1,15 +1,63 @@
-from flask import request, jsonify, current_app
-from marshmallow import ValidationError
+from flask import Response, current_app
+from marshmallow import ValidationError, EXCLUDE
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import load_only
 
 from app import db
 from app.models import User
+from app.utils.serialization import dumps, get_json_body, ojsonify
 from . import auth_bp
-from .schemas import LoginSchema, UserSchema
+from .schemas import UserSchema
 
 
+# Colunas de User usadas no login (verificação da senha, token e to_dict).
+# Colunas adicionadas futuramente à tabela não são carregadas nesta rota.
+LOGIN_COLS = (User.id, User.name, User.username, User.email, User.password_hash, User.role, User.created_at)
+
+# Schema de registro instanciado uma única vez; campos desconhecidos são ignorados.
+user_schema = UserSchema(unknown=EXCLUDE)
+
+# Prefixos JSON pré-serializados das respostas de login e registro (ver _user_token_response).
+_LOGIN_PREFIX = b'{"message":' + dumps('Login realizado com sucesso') + b',"user":'
+_REGISTER_PREFIX = b'{"message":' + dumps('Usuário registrado com sucesso!') + b',"user":'
+
+
+def _user_token_response(prefix, user, token, status):
+    # Monta a resposta {"message", "user", "access_token"} concatenando bytes já serializados.
+    # O JSON do usuário vem de User.to_json(); o token JWT só contém caracteres
+    # base64url e pontos, por isso pode ser inserido entre aspas sem escape.
+    body = prefix + user.to_json() + b',"access_token":"' + token.encode('ascii') + b'"}'
+    return Response(body, status=status, mimetype='application/json')
+
+
+def _validate_login(payload):
+    # Valida o corpo do login sem passar pelo marshmallow (rota de alto tráfego).
+    # Mantém as mesmas mensagens de erro que o antigo LoginSchema.
+    # 
+    # Args:
+    #     payload: Corpo JSON da requisição.
+    # 
+    # Returns:
+    #     tuple: (data, errors) - dados validados e dicionário de erros (vazio se válido).
+    if not isinstance(payload, dict):
+        return None, {'_schema': ['Invalid input type.']}
+
+    data = {}
+    errors = {}
+    for field, required_message in (
+        ('username', 'O nome de usuário é obrigatório'),
+        ('password', 'A senha é obrigatória'),
+    ):
+        value = payload.get(field)
+        if value is None:
+            errors[field] = [required_message]
+        elif not isinstance(value, str):
+            errors[field] = ['Not a valid string.']
+        else:
+            data[field] = value
+    return data, errors
 
-login_schema = LoginSchema()
-user_schema = UserSchema()
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -23,45 +71,53 @@ def login():
     #     400: Erro se os dados enviados são inválidos (falta campos, formato incorreto).
     #     401: Erro se o usuário não existe ou a senha está incorreta.
     #     500: Erro interno do servidor.
-    try:
-        # Valida os dados recebidos no corpo da requisição JSON usando o LoginSchema.
-        data = login_schema.load(request.json or {})
-    except ValidationError as err:
+    # Valida os dados recebidos no corpo da requisição JSON.
+    payload = get_json_body()
+    data, errors = _validate_login(payload or {})
+    if errors:
         # Se a validação falhar, retorna erro 400 com os detalhes da validação.
-        current_app.logger.warning(f"Erro de validação no login para dados: {request.json}. Erros: {err.messages}")
-        return jsonify({
+        current_app.logger.warning(f"Erro de validação no login para dados: {payload}. Erros: {errors}")
+        return ojsonify({
             'message': 'Erro de validação nos dados de login', 
-            'errors': err.messages
-        }), 400
+            'errors': errors
+        }, 400)
     
     try:
         # Busca o usuário no banco de dados pelo username fornecido.
-        user = User.query.filter_by(username=data['username']).first()
+        user = User.query.options(load_only(*LOGIN_COLS)).filter_by(username=data['username']).first()
         
         # Verifica se o usuário foi encontrado e se a senha fornecida é válida.
         if user and user.verify_password(data['password']):
+            # Persiste o hash convertido para argon2id, se a senha foi re-hasheada na verificação.
+            if user in db.session.dirty:
+                db.session.commit()
+            
             # Se as credenciais são válidas, gera um token JWT para o usuário.
             token = user.generate_token()
             
             current_app.logger.info(f"Login bem-sucedido para o usuário {user.username} (ID: {user.id})")
             # Retorna sucesso (200) com mensagem, dados do usuário e o token.
-            return jsonify({
-                'message': 'Login realizado com sucesso',
-                'user': user.to_dict(), # Converte o objeto User para dicionário
-                'access_token': token
-            }), 200
+            return _user_token_response(_LOGIN_PREFIX, user, token, 200)
         else:
             # Se o usuário não existe ou a senha está incorreta, retorna erro 401 (Não autorizado).
             current_app.logger.warning(f"Tentativa de login mal-sucedida para o usuário {data.get('username', '[username não fornecido]')}")
-            return jsonify({'message': 'Credenciais inválidas (usuário ou senha incorretos)'}), 401
+            return ojsonify({'message': 'Credenciais inválidas (usuário ou senha incorretos)'}, 401)
         
+    except SQLAlchemyError as e:
+        # Erro conhecido de banco de dados: registra apenas o tipo, sem o traceback completo.
+        db.session.rollback()
+        current_app.logger.error("Erro de banco de dados durante o login: %s", e.__class__.__name__)
+        return ojsonify({
+            'message': 'Ocorreu um erro interno durante o login',
+            'error': str(e)
+        }, 500)
     except Exception as e:
         # Captura qualquer outra exceção inesperada durante o processo.
         current_app.logger.error(f"Erro inesperado durante o login para {data.get('username')}: {str(e)}", exc_info=True)
-        return jsonify({
+        return ojsonify({
             'message': 'Ocorreu um erro interno durante o login',
             'error': str(e)
-        }), 500
+        }, 500)
 
 @auth_bp.route('/register', methods=['POST'])
 def register():
@@ -76,25 +132,28 @@ def register():
     #     500: Erro interno do servidor.
     try:
         # Valida os dados recebidos no corpo da requisição JSON usando o UserSchema.
-        data = user_schema.load(request.json or {})
+        payload = get_json_body()
+        data = user_schema.load(payload or {})
     except ValidationError as err:
         # Se a validação falhar, retorna erro 400 com os detalhes.
-        current_app.logger.warning(f"Erro de validação no registro: {err.messages}. Dados: {request.json}")
-        return jsonify({
+        current_app.logger.warning(f"Erro de validação no registro: {err.messages}. Dados: {payload}")
+        return ojsonify({
             'message': 'Erro de validação nos dados de registro', 
             'errors': err.messages
-        }), 400
+        }, 400)
     
     try:
-        # Verifica se já existe um usuário com o mesmo username.
-        if User.query.filter_by(username=data['username']).first():
-            current_app.logger.info(f"Tentativa de registro falhou: username '{data['username']}' já existe.")
-            return jsonify({'message': f"O nome de usuário '{data['username']}' já está em uso.", 'field': 'username'}), 400
-            
-        # Verifica se já existe um usuário com o mesmo email.
-        if User.query.filter_by(email=data['email']).first():
+        # Verifica em uma única consulta se o username ou o email já estão em uso.
+        # As constraints UNIQUE da tabela continuam sendo a verificação definitiva (ver IntegrityError abaixo).
+        existing = db.session.query(User.username, User.email).filter(
+            or_(User.username == data['username'], User.email == data['email'])
+        ).first()
+        if existing:
+            if existing.username == data['username']:
+                current_app.logger.info(f"Tentativa de registro falhou: username '{data['username']}' já existe.")
+                return ojsonify({'message': f"O nome de usuário '{data['username']}' já está em uso.", 'field': 'username'}, 400)
             current_app.logger.info(f"Tentativa de registro falhou: email '{data['email']}' já existe.")
-            return jsonify({'message': f"O e-mail '{data['email']}' já está cadastrado.", 'field': 'email'}), 400
+            return ojsonify({'message': f"O e-mail '{data['email']}' já está cadastrado.", 'field': 'email'}, 400)
         
         # Se username e email são únicos, cria uma nova instância de User.
         # A senha passada no construtor será automaticamente hasheada pelo setter no modelo User.
@@ -117,17 +176,27 @@ def register():
         token = user.generate_token()
         
         # Retorna sucesso (201 Created) com mensagem, dados do usuário e o token.
-        return jsonify({
-            'message': 'Usuário registrado com sucesso!',
-            'user': user.to_dict(),
-            'access_token': token # Permite login automático após registro no frontend
-        }), 201
+        # O token permite login automático após registro no frontend.
+        return _user_token_response(_REGISTER_PREFIX, user, token, 201)
         
+    except IntegrityError:
+        # Registro concorrente com o mesmo username/email passou pela verificação acima.
+        db.session.rollback()
+        current_app.logger.info(f"Tentativa de registro falhou: username '{data['username']}' ou email '{data['email']}' já existe.")
+        return ojsonify({'message': 'O nome de usuário ou e-mail informado já está em uso.'}, 400)
+    except SQLAlchemyError as e:
+        # Erro conhecido de banco de dados: registra apenas o tipo, sem o traceback completo.
+        db.session.rollback()
+        current_app.logger.error("Erro de banco de dados durante o registro: %s", e.__class__.__name__)
+        return ojsonify({
+            'message': 'Ocorreu um erro interno ao registrar o usuário',
+            'error': str(e)
+        }, 500)
     except Exception as e:
         # Em caso de qualquer erro durante a criação ou commit, desfaz a transação.
         db.session.rollback()
         current_app.logger.error(f"Erro inesperado durante o registro do usuário {data.get('username')}: {str(e)}", exc_info=True)
-        return jsonify({
+        return ojsonify({
             'message': 'Ocorreu um erro interno ao registrar o usuário',
             'error': str(e)
-        }), 500 
\ No newline at end of file
+        }, 500) 
\ No newline at end of file
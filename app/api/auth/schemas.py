@@ -35,20 +35,3 @@ class UserSchema(Schema):
         error_messages={'invalid': 'Função inválida. Deve ser: admin, vendedor ou suporte'}
     )
 
-
-class LoginSchema(Schema):
-    """
-    Esquema para validação dos dados de login.
-    
-    Fields:
-        username: Nome de usuário
-        password: Senha
-    """
-    username = fields.String(
-        required=True,
-        error_messages={'required': 'O nome de usuário é obrigatório'}
-    )
-    password = fields.String(
-        required=True,
-        error_messages={'required': 'A senha é obrigatória'}
-    ) 
\ No newline at end of file
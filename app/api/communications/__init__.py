@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-communications_bp = Blueprint('communications', __name__, url_prefix='/communications')
+communications_bp = Blueprint('communications', __name__)
 
 from . import routes
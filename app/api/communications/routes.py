@@ -1,275 +1,314 @@
 from flask import request, jsonify, current_app
-from marshmallow import ValidationError
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from datetime import datetime
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, load_only, raiseload, selectinload
+import hashlib
 import os
+import re
+import secrets
 
 from app import db
+from app.api._errors import INVALID_CURSOR, bad_request, forbidden, not_found
+from app.api.documents import cache as documents_cache
 from app.models import Communication, User, Document
+from app.utils.auth import get_caller
+from app.utils.decorators import handle_errors
+from app.utils.pagination import decode_cursor, keyset_page
+from app.utils.queries import record_exists, search_pattern
+from app.utils.serialization import ojsonify
+from app.utils.uploads import delete_files_later, get_upload_dir, save_upload
 from . import communications_bp
-from .schemas import CommunicationSchema
+from .schemas import CommunicationSchema, validate_entity_id
 
 communication_schema = CommunicationSchema()
 communications_schema = CommunicationSchema(many=True)
 
+COMM_NOT_FOUND = 'Comunicação não encontrada'
+
+# Relacionamentos usados por Communication.to_dict(), carregados em lote para evitar N+1:
+# usuário (JOIN), anexos e o uploader de cada anexo (SELECT ... WHERE id IN (...)).
+COMMUNICATION_LOAD_OPTIONS = (
+    joinedload(Communication.user),
+    selectinload(Communication.attachments).joinedload(Document.uploader),
+)
+
+# Na listagem (to_dict(mode='list')) o SELECT traz apenas as colunas exibidas (sem 'content'),
+# o nome do usuário e as chaves dos anexos (apenas para a contagem).
+COMMUNICATION_LIST_LOAD_OPTIONS = (
+    load_only(Communication.id, Communication.comm_type, Communication.subject, Communication.outcome,
+              Communication.date_time, Communication.duration_minutes, Communication.entity_type,
+              Communication.entity_id, Communication.user_id),
+    joinedload(Communication.user).load_only(User.id, User.name),
+    selectinload(Communication.attachments).load_only(Document.id, Document.communication_id),
+)
+
+# Colunas usadas pela busca textual (parâmetro 'search')
+_COMM_SEARCH_COLS = (Communication.subject, Communication.content)
+
+# Datas dos filtros no formato YYYY-MM-DD (mais rápido que datetime.strptime a cada requisição)
+_DATE_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+
+
+def _parse_ymd(value):
+    # Converte 'YYYY-MM-DD' em datetime (meia-noite); lança ValueError se o formato for inválido.
+    match = _DATE_RE.match(value)
+    if not match:
+        raise ValueError(f"Data inválida: {value}")
+    return datetime(int(match[1]), int(match[2]), int(match[3]))
+
+
 @communications_bp.route('/', methods=['GET'])
 @jwt_required()
+@handle_errors('listar comunicações')
 def get_communications():
     """Lista todas as comunicações com filtros opcionais"""
-    try:
-        # Parâmetros de filtro
-        comm_type = request.args.get('comm_type')
-        entity_type = request.args.get('entity_type')
-        entity_id = request.args.get('entity_id')
-        user_id = request.args.get('user_id')
-        outcome = request.args.get('outcome')
-        search = request.args.get('search')
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        
-        # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
-        per_page = min(request.args.get('per_page', 20, type=int), 100)
-        
-        query = Communication.query
+    # Parâmetros de filtro
+    comm_type = request.args.get('comm_type')
+    entity_type = request.args.get('entity_type')
+    entity_id = request.args.get('entity_id')
+    user_id = request.args.get('user_id')
+    outcome = request.args.get('outcome')
+    search = request.args.get('search')
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    # Parâmetros de paginação: por cursor (padrão) ou por página, se 'page' for informado
+    page = request.args.get('page', type=int)
+    cursor = request.args.get('cursor')
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    include_total = request.args.get('include_total') == '1'
+    
+    # Qualquer outro relacionamento acessado na serialização gera erro em vez de N+1 silencioso
+    query = Communication.query.options(*COMMUNICATION_LIST_LOAD_OPTIONS, raiseload('*'))
+    
+    # Aplicar filtros
+    if comm_type:
+        query = query.filter(Communication.comm_type == comm_type)
+    if entity_type:
+        query = query.filter(Communication.entity_type == entity_type)
+    if entity_id:
+        query = query.filter(Communication.entity_id == entity_id)
+    if user_id:
+        query = query.filter(Communication.user_id == user_id)
+    if outcome:
+        query = query.filter(Communication.outcome == outcome)
+    if search:
+        search_term = search_pattern(search)
+        query = query.filter(or_(*(col.ilike(search_term) for col in _COMM_SEARCH_COLS)))
+    if start_date:
+        try:
+            start_date_obj = _parse_ymd(start_date)
+            query = query.filter(Communication.date_time >= start_date_obj)
+        except ValueError:
+            current_app.logger.warning(f"Formato de data inicial inválido: {start_date}")
+    if end_date:
+        try:
+            # Intervalo semiaberto: até o início do dia seguinte, incluindo todo o último dia
+            end_date_obj = _parse_ymd(end_date) + timedelta(days=1)
+            query = query.filter(Communication.date_time < end_date_obj)
+        except ValueError:
+            current_app.logger.warning(f"Formato de data final inválido: {end_date}")
+    
+    if page is None or cursor:
+        # Paginação por cursor: busca por intervalo no índice (date_time DESC, id DESC),
+        # sem COUNT(*) nem OFFSET. O total só é calculado se include_total=1.
+        try:
+            cursor_key = decode_cursor(cursor) if cursor else None
+        except ValueError:
+            return bad_request(INVALID_CURSOR)
         
-        # Aplicar filtros
-        if comm_type:
-            query = query.filter(Communication.comm_type == comm_type)
-        if entity_type:
-            query = query.filter(Communication.entity_type == entity_type)
-        if entity_id:
-            query = query.filter(Communication.entity_id == entity_id)
-        if user_id:
-            query = query.filter(Communication.user_id == user_id)
-        if outcome:
-            query = query.filter(Communication.outcome == outcome)
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                Communication.subject.ilike(search_term) | 
-                Communication.content.ilike(search_term)
-            )
-        if start_date:
-            try:
-                start_date_obj = datetime.strptime(start_date, '%Y-%m-%d')
-                query = query.filter(Communication.date_time >= start_date_obj)
-            except ValueError:
-                current_app.logger.warning(f"Formato de data inicial inválido: {start_date}")
-        if end_date:
-            try:
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d')
-                # Adicionar 1 dia para incluir todo o último dia
-                end_date_obj = end_date_obj.replace(hour=23, minute=59, second=59)
-                query = query.filter(Communication.date_time <= end_date_obj)
-            except ValueError:
-                current_app.logger.warning(f"Formato de data final inválido: {end_date}")
-        
-        # Ordenação padrão: comunicações mais recentes primeiro
-        query = query.order_by(Communication.date_time.desc())
-        
-        # Executar a consulta paginada
-        paginated_comms = query.paginate(page=page, per_page=per_page, error_out=False)
+        total = query.order_by(None).count() if include_total else None
+        comms, next_cursor = keyset_page(query, Communication.date_time, Communication.id,
+                                         per_page, cursor_key)
+        pagination = {
+            'per_page': per_page,
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
+        }
+        if include_total:
+            pagination['total_items'] = total
         
-        # Preparar a resposta
-        return jsonify({
-            'communications': [comm.to_dict() for comm in paginated_comms.items],
-            'pagination': {
-                'total_items': paginated_comms.total,
-                'total_pages': paginated_comms.pages,
-                'current_page': paginated_comms.page,
-                'per_page': paginated_comms.per_page,
-                'has_next': paginated_comms.has_next,
-                'has_prev': paginated_comms.has_prev
-            }
-        }), 200
-    except Exception as e:
-        current_app.logger.error(f"Erro ao listar comunicações: {str(e)}")
-        return jsonify({'error': 'Erro ao listar comunicações', 'details': str(e)}), 500
+        return ojsonify({
+            'communications': [comm.to_dict(mode='list') for comm in comms],
+            'pagination': pagination
+        })
+    
+    # Ordenação padrão: comunicações mais recentes primeiro
+    query = query.order_by(Communication.date_time.desc(), Communication.id.desc())
+    
+    # Executar a consulta paginada
+    paginated_comms = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    # Preparar a resposta
+    return ojsonify({
+        'communications': [comm.to_dict(mode='list') for comm in paginated_comms.items],
+        'pagination': {
+            'total_items': paginated_comms.total,
+            'total_pages': paginated_comms.pages,
+            'current_page': paginated_comms.page,
+            'per_page': paginated_comms.per_page,
+            'has_next': paginated_comms.has_next,
+            'has_prev': paginated_comms.has_prev
+        }
+    })
 
 @communications_bp.route('/', methods=['POST'])
 @jwt_required()
+@handle_errors('registrar comunicação')
 def create_communication():
     """Registra uma nova comunicação"""
-    try:
-        # Tratar dados JSON e formulário com arquivos
-        data = request.form.to_dict() if request.form else request.json or {}
+    # Tratar dados JSON e formulário com arquivos
+    data = request.form.to_dict() if request.form else request.json or {}
+    
+    # Validar dados com o schema
+    validated_data = communication_schema.load(data)
+    
+    # Verificar se o usuário existe
+    if not record_exists(User, id=validated_data.get('user_id')):
+        return bad_request('Usuário não encontrado')
         
-        # Configurar contexto para validação
-        communication_schema.context = {
-            'entity_type': data.get('entity_type')
-        }
-        
-        # Validar dados com o schema
-        validated_data = communication_schema.load(data)
-    except ValidationError as err:
-        return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
-
-    try:
-        # Verificar se o usuário existe
-        if not User.query.get(validated_data.get('user_id')):
-            return jsonify({'message': 'Usuário não encontrado'}), 400
+    # Criar a comunicação
+    communication = Communication(
+        comm_type=validated_data['comm_type'],
+        subject=validated_data.get('subject'),
+        content=validated_data.get('content'),
+        outcome=validated_data.get('outcome'),
+        date_time=validated_data.get('date_time') or datetime.utcnow(),
+        duration_minutes=validated_data.get('duration_minutes'),
+        entity_type=validated_data.get('entity_type'),
+        entity_id=validated_data.get('entity_id'),
+        user_id=validated_data.get('user_id') or get_jwt_identity()
+    )
+    
+    db.session.add(communication)
+    db.session.flush()  # Obter ID sem commit
+    
+    # Processar arquivos enviados
+    files = request.files.getlist("files") if request.files else []
+    uploaded_files = []
+    
+    # Definir o diretório de uploads (criado no primeiro upload)
+    upload_dir = get_upload_dir('communications') if files else None
+    # Timestamp calculado uma única vez para todos os arquivos da requisição
+    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S') if files else None
+    
+    for file in files:
+        if file and file.filename:
+            # Gerar nome único para o arquivo (sufixo aleatório evita colisões no mesmo segundo)
+            ext = os.path.splitext(file.filename)[1]
+            unique_filename = f"{timestamp}_{communication.id}_{len(uploaded_files)}_{secrets.token_hex(4)}{ext}"
             
-        # Criar a comunicação
-        communication = Communication(
-            comm_type=validated_data['comm_type'],
-            subject=validated_data.get('subject'),
-            content=validated_data.get('content'),
-            outcome=validated_data.get('outcome'),
-            date_time=validated_data.get('date_time') or datetime.utcnow(),
-            duration_minutes=validated_data.get('duration_minutes'),
-            entity_type=validated_data.get('entity_type'),
-            entity_id=validated_data.get('entity_id'),
-            user_id=validated_data.get('user_id') or get_jwt_identity()
-        )
-        
-        db.session.add(communication)
-        db.session.flush()  # Obter ID sem commit
-        
-        # Processar arquivos enviados
-        files = request.files.getlist("files") if request.files else []
-        uploaded_files = []
-        
-        for file in files:
-            if file and file.filename:
-                # Gerar nome único para o arquivo
-                ext = os.path.splitext(file.filename)[1]
-                unique_filename = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{communication.id}_{len(uploaded_files)}{ext}"
-                
-                # Definir o diretório de uploads
-                upload_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'communications')
-                
-                # Criar o diretório se não existir
-                os.makedirs(upload_dir, exist_ok=True)
-                
-                # Caminho completo do arquivo
-                file_path = os.path.join(upload_dir, unique_filename)
-                
-                # Salvar o arquivo
-                file.save(file_path)
-                
-                # Criar registro do documento
-                document = Document(
-                    filename=unique_filename,
-                    original_filename=file.filename,
-                    file_path=file_path,
-                    file_size=os.path.getsize(file_path),
-                    file_type=file.content_type,
-                    entity_type='communication',
-                    entity_id=communication.id,
-                    communication_id=communication.id,
-                    uploaded_by=communication.user_id
-                )
-                
-                db.session.add(document)
-                uploaded_files.append(document)
-        
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Comunicação registrada com sucesso',
-            'communication': communication.to_dict(),
-            'attachments': [doc.to_dict(include_content=False) for doc in uploaded_files]
-        }), 201
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Erro ao registrar comunicação: {str(e)}")
-        return jsonify({'error': 'Erro ao registrar comunicação', 'details': str(e)}), 500
+            # Caminho completo do arquivo
+            file_path = os.path.join(upload_dir, unique_filename)
+            
+            # Salvar o arquivo em blocos, obtendo o tamanho e o SHA-256 durante a gravação
+            hasher = hashlib.sha256()
+            file_size = save_upload(file, file_path, hasher=hasher)
+            
+            # Criar registro do documento
+            document = Document(
+                filename=unique_filename,
+                original_filename=file.filename,
+                file_path=file_path,
+                file_size=file_size,
+                file_type=file.content_type,
+                content_sha256=hasher.hexdigest(),
+                entity_type='communication',
+                entity_id=communication.id,
+                communication_id=communication.id,
+                uploaded_by=communication.user_id
+            )
+            
+            db.session.add(document)
+            uploaded_files.append(document)
+    
+    db.session.commit()
+    if uploaded_files:
+        documents_cache.invalidate()
+    
+    return jsonify({
+        'message': 'Comunicação registrada com sucesso',
+        'communication': communication.to_dict(),
+        'attachments': [doc.to_dict(include_content=False) for doc in uploaded_files]
+    }), 201
 
 @communications_bp.route('/<int:comm_id>', methods=['GET'])
 @jwt_required()
+@handle_errors('buscar comunicação')
 def get_communication(comm_id):
     """Obtém os detalhes de uma comunicação específica"""
-    try:
-        communication = Communication.query.get(comm_id)
-        if not communication:
-            return jsonify({'message': 'Comunicação não encontrada'}), 404
-        return jsonify({'communication': communication.to_dict()}), 200
-    except Exception as e:
-        current_app.logger.error(f"Erro ao buscar comunicação {comm_id}: {str(e)}")
-        return jsonify({'error': 'Erro ao buscar comunicação', 'details': str(e)}), 500
+    communication = Communication.query.options(*COMMUNICATION_LOAD_OPTIONS).filter_by(id=comm_id).first()
+    if not communication:
+        return not_found(COMM_NOT_FOUND)
+    return jsonify({'communication': communication.to_dict()}), 200
 
 @communications_bp.route('/<int:comm_id>', methods=['PUT'])
 @jwt_required()
+@handle_errors('atualizar comunicação')
 def update_communication(comm_id):
     """Atualiza uma comunicação existente"""
-    try:
-        communication = Communication.query.get(comm_id)
-        if not communication:
-            return jsonify({'message': 'Comunicação não encontrada'}), 404
-            
-        data = request.json or {}
+    communication = Communication.query.options(*COMMUNICATION_LOAD_OPTIONS).filter_by(id=comm_id).first()
+    if not communication:
+        return not_found(COMM_NOT_FOUND)
         
-        # Configurar contexto para validação
-        communication_schema.context = {
-            'entity_type': data.get('entity_type', communication.entity_type)
-        }
+    data = request.json or {}
+    
+    # Validar dados parcialmente
+    validated_data = communication_schema.load(data, partial=True)
+    
+    # Sem entity_type na requisição, entity_id é validado contra o tipo já salvo
+    if 'entity_id' in validated_data and 'entity_type' not in validated_data:
+        validate_entity_id(communication.entity_type, validated_data['entity_id'])
+    
+    # Verificar permissões
+    current_user_id, user_role = get_caller()
+    
+    # Permitir edição apenas para admins ou o usuário que registrou
+    if user_role != 'admin' and str(communication.user_id) != current_user_id:
+        return forbidden()
         
-        # Validar dados parcialmente
-        validated_data = communication_schema.load(data, partial=True)
-    except ValidationError as err:
-        return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
-
-    try:
-        # Verificar permissões
-        jwt_data = get_jwt()
-        user_role = jwt_data.get('role', '')
-        current_user_id = get_jwt_identity()
-        
-        # Permitir edição apenas para admins ou o usuário que registrou
-        if user_role != 'admin' and str(communication.user_id) != current_user_id:
-            return jsonify({'message': 'Permissão negada'}), 403
-            
-        # Atualizar campos
-        for field, value in validated_data.items():
-            setattr(communication, field, value)
-        
-        db.session.commit()
-        
-        return jsonify({
-            'message': 'Comunicação atualizada com sucesso',
-            'communication': communication.to_dict()
-        }), 200
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Erro ao atualizar comunicação {comm_id}: {str(e)}")
-        return jsonify({'error': 'Erro ao atualizar comunicação', 'details': str(e)}), 500
+    # Atualizar campos
+    for field, value in validated_data.items():
+        setattr(communication, field, value)
+    
+    db.session.commit()
+    
+    return jsonify({
+        'message': 'Comunicação atualizada com sucesso',
+        'communication': communication.to_dict()
+    }), 200
 
 @communications_bp.route('/<int:comm_id>', methods=['DELETE'])
 @jwt_required()
+@handle_errors('remover comunicação')
 def delete_communication(comm_id):
     """Remove uma comunicação"""
-    try:
-        communication = Communication.query.get(comm_id)
-        if not communication:
-            return jsonify({'message': 'Comunicação não encontrada'}), 404
-            
-        # Verificar permissões
-        jwt_data = get_jwt()
-        user_role = jwt_data.get('role', '')
-        current_user_id = get_jwt_identity()
-        
-        # Permitir exclusão apenas para admins ou o usuário que registrou
-        if user_role != 'admin' and str(communication.user_id) != current_user_id:
-            return jsonify({'message': 'Permissão negada'}), 403
-            
-        # Salvar lista de documentos para excluir os arquivos físicos após commit
-        documents_to_delete = [doc.file_path for doc in communication.attachments]
-        
-        # Excluir a comunicação (e seus anexos via cascade)
-        db.session.delete(communication)
-        db.session.commit()
+    # Busca apenas o autor, bloqueando a linha até o fim da transação (SELECT ... FOR UPDATE)
+    owner = db.session.query(Communication.user_id).filter_by(id=comm_id).with_for_update().first()
+    if not owner:
+        return not_found(COMM_NOT_FOUND)
         
-        # Excluir arquivos físicos
-        for file_path in documents_to_delete:
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as file_err:
-                current_app.logger.warning(f"Erro ao excluir arquivo {file_path}: {str(file_err)}")
+    # Verificar permissões
+    current_user_id, user_role = get_caller()
+    
+    # Permitir exclusão apenas para admins ou o usuário que registrou
+    if user_role != 'admin' and str(owner.user_id) != current_user_id:
+        db.session.rollback()  # Libera o bloqueio da linha
+        return forbidden()
         
-        return jsonify({'message': 'Comunicação removida com sucesso'}), 200
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Erro ao remover comunicação {comm_id}: {str(e)}")
-        return jsonify({'error': 'Erro ao remover comunicação', 'details': str(e)}), 500
+    # Salvar lista de documentos para excluir os arquivos físicos após commit
+    documents_to_delete = [file_path for (file_path,) in
+                           db.session.query(Document.file_path).filter_by(communication_id=comm_id)]
+    
+    # Excluir os anexos e a comunicação diretamente no banco, sem carregar os objetos
+    # (equivalente ao cascade 'all, delete-orphan' de Communication.attachments)
+    db.session.execute(db.delete(Document).where(Document.communication_id == comm_id))
+    db.session.execute(db.delete(Communication).where(Communication.id == comm_id))
+    db.session.commit()
+    documents_cache.invalidate()
+    
+    # Excluir arquivos físicos em segundo plano
+    delete_files_later(documents_to_delete)
+    
+    return jsonify({'message': 'Comunicação removida com sucesso'}), 200
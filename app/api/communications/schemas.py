@@ -1,7 +1,18 @@
-from marshmallow import Schema, fields, validate, validates, ValidationError
+from marshmallow import EXCLUDE, Schema, fields, validate, validates_schema, ValidationError
+
+def validate_entity_id(entity_type, entity_id):
+    """Valida que entity_id está presente apenas se entity_type não for 'none'"""
+    if entity_type and entity_type != 'none' and (entity_id is None or entity_id <= 0):
+        raise ValidationError({'entity_id': ["O ID da entidade é obrigatório quando um tipo de entidade é fornecido"]})
+
 
 class CommunicationSchema(Schema):
     """Schema para validação e serialização de comunicações"""
+    
+    class Meta:
+        # Campos desconhecidos são ignorados em vez de gerar erro
+        unknown = EXCLUDE
+    
     id = fields.Int(dump_only=True)
     
     comm_type = fields.Str(required=True, validate=validate.OneOf([
@@ -24,14 +35,19 @@ class CommunicationSchema(Schema):
     user_name = fields.Str(dump_only=True)
     
     attachments = fields.List(fields.Dict(), dump_only=True)
+    attachment_count = fields.Int(dump_only=True)
     
     created_at = fields.DateTime(format='%Y-%m-%d %H:%M:%S', dump_only=True)
     updated_at = fields.DateTime(format='%Y-%m-%d %H:%M:%S', dump_only=True)
     
-    @validates('entity_id')
-    def validate_entity_id(self, value):
-        """Valida que entity_id está presente apenas se entity_type não for 'none'"""
-        entity_type = self.context.get('entity_type')
-        if entity_type and entity_type != 'none' and (value is None or value <= 0):
-            raise ValidationError("O ID da entidade é obrigatório quando um tipo de entidade é fornecido")
-        return value
+    @validates_schema
+    def validate_entity(self, data, **kwargs):
+        """
+        Valida entity_id com base no entity_type dos próprios dados carregados.
+        
+        O schema é compartilhado entre requisições, por isso não usa self.context; em
+        atualizações parciais sem entity_type, a rota chama validate_entity_id com o
+        tipo já salvo na comunicação.
+        """
+        if 'entity_id' in data and 'entity_type' in data:
+            validate_entity_id(data['entity_type'], data['entity_id'])
@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-custom_fields_bp = Blueprint('custom_fields', __name__, url_prefix='/custom-fields')
+custom_fields_bp = Blueprint('custom_fields', __name__)
 
 from . import routes
@@ -0,0 +1,33 @@
+"""
+Cache em memória (por processo, com TTL curto) das definições de campos personalizados.
+
+As definições mudam raramente e são consultadas a cada listagem; o cache guarda
+os dicionários já serializados (to_dict) e é invalidado nas rotas de escrita.
+Em outros processos, alterações ficam visíveis após no máximo CACHE_TTL segundos.
+"""
+
+from app.models import CustomField
+from app.utils.cache import TTLCache
+
+CACHE_TTL = 30  # segundos
+
+_cache = TTLCache(CACHE_TTL)  # chave ('active' ou 'all') -> lista de dicionários
+
+
+def get_custom_fields(show_all=False):
+    # Retorna as definições de campos personalizados como lista de dicionários.
+    # 
+    # Args:
+    #     show_all (bool): Se True, inclui campos inativos.
+    # 
+    # Returns:
+    #     list: Campos personalizados serializados com to_dict().
+    def build():
+        query = CustomField.query if show_all else CustomField.query.filter_by(active=True)
+        return [cf.to_dict() for cf in query.all()]
+    
+    return _cache.get_or_set('all' if show_all else 'active', build)
+
+
+# Descarta o cache após criar, atualizar ou remover um campo personalizado.
+invalidate = _cache.clear
@@ -5,12 +5,12 @@ from flask_jwt_extended import jwt_required, get_jwt
 
 from app import db
 from app.models import CustomField, CustomFieldValue
+from app.utils.queries import record_exists
 # Import blueprint from the module's __init__.py
 from . import custom_fields_bp
+from . import cache as custom_fields_cache
 from .schemas import CustomFieldSchema
 
-# custom_fields_bp = Blueprint('custom_fields', __name__, url_prefix='/custom-fields') # Removed: Defined in __init__.py
-
 custom_field_schema = CustomFieldSchema()
 custom_fields_schema = CustomFieldSchema(many=True) # Para listas
 
@@ -20,11 +20,7 @@ def get_custom_fields():
     """Lista todos os campos personalizados"""
     try:
         show_all = request.args.get('show_all', 'false').lower() == 'true'
-        if show_all:
-            custom_fields = CustomField.query.all()
-        else:
-            custom_fields = CustomField.query.filter_by(active=True).all()
-        return jsonify({'custom_fields': [cf.to_dict() for cf in custom_fields]}), 200
+        return jsonify({'custom_fields': custom_fields_cache.get_custom_fields(show_all)}), 200
     except Exception as e:
         current_app.logger.error(f"Erro ao listar campos personalizados: {str(e)}")
         return jsonify({'error': 'Erro ao listar campos personalizados', 'details': str(e)}), 500
@@ -43,7 +39,7 @@ def create_custom_field():
         return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
 
     try:
-        if CustomField.query.filter_by(name=data['name']).first():
+        if record_exists(CustomField, name=data['name']):
             return jsonify({'message': 'Já existe um campo com este nome'}), 400
         
         options_json = None
@@ -60,6 +56,7 @@ def create_custom_field():
         
         db.session.add(custom_field)
         db.session.commit()
+        custom_fields_cache.invalidate()
         return jsonify({
             'message': 'Campo personalizado criado com sucesso',
             'custom_field': custom_field.to_dict()
@@ -100,8 +97,7 @@ def update_custom_field(field_id):
         return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
 
     try:
-        existing = CustomField.query.filter(CustomField.name == data['name'], CustomField.id != field_id).first()
-        if existing:
+        if record_exists(CustomField, CustomField.id != field_id, name=data['name']):
             return jsonify({'message': 'Já existe outro campo com este nome'}), 400
         
         custom_field.name = data.get('name', custom_field.name)
@@ -116,6 +112,7 @@ def update_custom_field(field_id):
         custom_field.active = data.get('active', custom_field.active)
         
         db.session.commit()
+        custom_fields_cache.invalidate()
         return jsonify({
             'message': 'Campo personalizado atualizado com sucesso',
             'custom_field': custom_field.to_dict()
@@ -139,15 +136,15 @@ def delete_custom_field(field_id):
 
     try:
         # Verifica se o campo está sendo usado
-        values_exist = CustomFieldValue.query.filter_by(custom_field_id=field_id).first()
-        
-        if values_exist:
+        if record_exists(CustomFieldValue, custom_field_id=field_id):
             custom_field.active = False
             db.session.commit()
+            custom_fields_cache.invalidate()
             return jsonify({'message': 'Campo personalizado marcado como inativo pois está em uso'}), 200
         else:
             db.session.delete(custom_field)
             db.session.commit()
+            custom_fields_cache.invalidate()
             return jsonify({'message': 'Campo personalizado removido com sucesso'}), 200
     except Exception as e:
         db.session.rollback()
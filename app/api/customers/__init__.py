@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-customers_bp = Blueprint('customers', __name__, url_prefix='/customers')
+customers_bp = Blueprint('customers', __name__)
 
 from . import routes
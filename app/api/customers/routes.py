@@ -1,177 +1,227 @@
-from flask import request, jsonify, current_app
-from marshmallow import ValidationError
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask import request, jsonify
+from flask_jwt_extended import jwt_required
+from sqlalchemy import or_
+from sqlalchemy.orm import joinedload, selectinload
 
 from app import db
+from app.api._errors import INVALID_CURSOR, bad_request, forbidden, not_found
 from app.models import Customer, CustomField, CustomFieldValue, User
+from app.utils.auth import get_caller
+from app.utils.decorators import handle_errors
+from app.utils.queries import record_exists, search_pattern
+from app.utils.serialization import ojsonify
 from . import customers_bp
-from .schemas import CustomerSchema
+from .schemas import CustomerSchema, StrictCustomerSchema
 
 customer_schema = CustomerSchema()
 customers_schema = CustomerSchema(many=True)
+strict_customer_schema = StrictCustomerSchema()
+
+CUSTOMER_NOT_FOUND = 'Cliente não encontrado'
+
+# Relacionamentos usados por Customer.to_dict() na listagem, carregados em lote e apenas com
+# as colunas exibidas (nome do responsável e nome de cada campo personalizado).
+# As colunas do próprio Customer são todas exibidas, por isso não há load_only nelas.
+CUSTOMER_LIST_LOAD_OPTIONS = (
+    joinedload(Customer.assigned_user).load_only(User.id, User.name),
+    selectinload(Customer.custom_fields).joinedload(CustomFieldValue.custom_field).load_only(CustomField.id, CustomField.name),
+)
+
+# Colunas usadas pela busca textual (parâmetro 'search')
+_CUST_SEARCH_COLS = (Customer.name, Customer.email, Customer.company)
+
+
+def _save_custom_field_values(customer_id, custom_fields_data, replace=False):
+    # Grava os valores de campos personalizados do cliente com um único INSERT de várias linhas.
+    # Campos inexistentes são ignorados (verificados em uma única consulta IN).
+    # 
+    # Args:
+    #     customer_id (int): ID do cliente.
+    #     custom_fields_data (dict): {id do campo: valor}.
+    #     replace (bool): Se True, remove antes os valores atuais desses campos (atualização).
+    if not custom_fields_data:
+        return
+    
+    values = {int(field_id): value for field_id, value in custom_fields_data.items()}
+    existing_field_ids = {
+        field_id for (field_id,) in
+        db.session.query(CustomField.id).filter(CustomField.id.in_(values))
+    }
+    rows = [
+        {
+            'customer_id': customer_id,
+            'custom_field_id': field_id,
+            'value': str(value) if value is not None else None
+        }
+        for field_id, value in values.items()
+        if field_id in existing_field_ids
+    ]
+    if not rows:
+        return
+    
+    table = CustomFieldValue.__table__
+    if replace:
+        db.session.execute(table.delete().where(
+            table.c.customer_id == customer_id,
+            table.c.custom_field_id.in_([row['custom_field_id'] for row in rows])
+        ))
+    db.session.execute(table.insert(), rows)
 
 @customers_bp.route('/', methods=['GET'])
 @jwt_required()
+@handle_errors('listar clientes')
 def get_customers():
     """Lista todos os clientes com filtros opcionais"""
-    try:
-        status = request.args.get('status')
-        assigned_to = request.args.get('assigned_to')
-        search = request.args.get('search')
+    status = request.args.get('status')
+    assigned_to = request.args.get('assigned_to')
+    search = request.args.get('search')
+    
+    query = Customer.query.options(*CUSTOMER_LIST_LOAD_OPTIONS)
+    
+    if status:
+        query = query.filter(Customer.status == status)
+    if assigned_to:
+        query = query.filter(Customer.assigned_to == assigned_to)
+    if search:
+        search_term = search_pattern(search)
+        query = query.filter(or_(*(col.ilike(search_term) for col in _CUST_SEARCH_COLS)))
+        
+    per_page = min(request.args.get('per_page', 20, type=int), 100)
+    cursor = request.args.get('cursor')
+    
+    if cursor:
+        # Paginação por cursor (último ID recebido): busca direta no índice da chave primária
+        try:
+            last_id = int(cursor)
+        except ValueError:
+            return bad_request(INVALID_CURSOR)
         
-        query = Customer.query
+        customers = query.filter(Customer.id < last_id).order_by(Customer.id.desc()).limit(per_page + 1).all()
+        has_next = len(customers) > per_page
+        customers = customers[:per_page]
         
-        if status:
-            query = query.filter(Customer.status == status)
-        if assigned_to:
-            query = query.filter(Customer.assigned_to == assigned_to)
-        if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                Customer.name.ilike(search_term) | 
-                Customer.email.ilike(search_term) | 
-                Customer.company.ilike(search_term)
-            )
-            
-        customers = query.all()
-        # Usar to_dict() aqui pois o schema é mais para validação de entrada
-        return jsonify({'customers': [c.to_dict() for c in customers]}), 200
-    except Exception as e:
-        current_app.logger.error(f"Erro ao listar clientes: {str(e)}")
-        return jsonify({'error': 'Erro ao listar clientes', 'details': str(e)}), 500
+        return ojsonify({
+            'customers': [c.to_dict() for c in customers],
+            'pagination': {
+                'per_page': per_page,
+                'has_next': has_next,
+                'next_cursor': str(customers[-1].id) if has_next else None
+            }
+        })
+    
+    page = request.args.get('page', 1, type=int)
+    paginated_customers = query.order_by(Customer.id.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    
+    # Usar to_dict() aqui pois o schema é mais para validação de entrada
+    return ojsonify({
+        'customers': [c.to_dict() for c in paginated_customers.items],
+        'pagination': {
+            'total_items': paginated_customers.total,
+            'total_pages': paginated_customers.pages,
+            'current_page': paginated_customers.page,
+            'per_page': paginated_customers.per_page,
+            'has_next': paginated_customers.has_next,
+            'has_prev': paginated_customers.has_prev,
+            # Cursor para continuar a listagem pela paginação por ID
+            'next_cursor': str(paginated_customers.items[-1].id) if paginated_customers.has_next else None
+        }
+    })
 
 @customers_bp.route('/', methods=['POST'])
 @jwt_required()
+@handle_errors('criar cliente')
 def create_customer():
     """Cria um novo cliente"""
-    try:
-        data = customer_schema.load(request.json or {})
-    except ValidationError as err:
-        return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
+    # ?strict_email=1 ativa a validação completa de email; por padrão usa apenas a expressão regular
+    schema = strict_customer_schema if request.args.get('strict_email') == '1' else customer_schema
+    data = schema.load(request.json or {})
 
-    try:
-        if data.get('assigned_to') and not User.query.get(data['assigned_to']):
-            return jsonify({'message': 'Usuário responsável não encontrado'}), 400
-            
-        custom_fields_data = data.pop('custom_fields', {})
-        
-        customer = Customer(
-            name=data['name'],
-            email=data.get('email'),
-            phone=data.get('phone'),
-            company=data.get('company'),
-            address=data.get('address'),
-            status=data.get('status', 'lead'),
-            assigned_to=data.get('assigned_to')
-        )
+    if data.get('assigned_to') and not record_exists(User, id=data['assigned_to']):
+        return bad_request('Usuário responsável não encontrado')
         
-        db.session.add(customer)
-        db.session.flush() 
-        
-        for field_id, value in custom_fields_data.items():
-            field = CustomField.query.get(int(field_id))
-            if field:
-                field_value = CustomFieldValue(
-                    customer_id=customer.id,
-                    custom_field_id=field.id,
-                    value=value
-                )
-                db.session.add(field_value)
-        
-        db.session.commit()
-        return jsonify({
-            'message': 'Cliente criado com sucesso',
-            'customer': customer.to_dict()
-        }), 201
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Erro ao criar cliente: {str(e)}")
-        return jsonify({'error': 'Erro ao criar cliente', 'details': str(e)}), 500
+    custom_fields_data = data.pop('custom_fields', {})
+    
+    customer = Customer(
+        name=data['name'],
+        email=data.get('email'),
+        phone=data.get('phone'),
+        company=data.get('company'),
+        address=data.get('address'),
+        status=data.get('status', 'lead'),
+        assigned_to=data.get('assigned_to')
+    )
+    
+    db.session.add(customer)
+    db.session.flush() 
+    
+    _save_custom_field_values(customer.id, custom_fields_data)
+    
+    db.session.commit()
+    return jsonify({
+        'message': 'Cliente criado com sucesso',
+        'customer': customer.to_dict()
+    }), 201
 
 @customers_bp.route('/<int:customer_id>', methods=['GET'])
 @jwt_required()
+@handle_errors('buscar cliente')
 def get_customer(customer_id):
     """Obtém os detalhes de um cliente"""
-    try:
-        customer = Customer.query.get(customer_id)
-        if not customer:
-            return jsonify({'message': 'Cliente não encontrado'}), 404
-        return jsonify({'customer': customer.to_dict()}), 200
-    except Exception as e:
-        current_app.logger.error(f"Erro ao buscar cliente {customer_id}: {str(e)}")
-        return jsonify({'error': 'Erro ao buscar cliente', 'details': str(e)}), 500
+    customer = Customer.query.get(customer_id)
+    if not customer:
+        return not_found(CUSTOMER_NOT_FOUND)
+    return jsonify({'customer': customer.to_dict()}), 200
 
 @customers_bp.route('/<int:customer_id>', methods=['PUT'])
 @jwt_required()
+@handle_errors('atualizar cliente')
 def update_customer(customer_id):
     """Atualiza um cliente"""
     customer = Customer.query.get(customer_id)
     if not customer:
-        return jsonify({'message': 'Cliente não encontrado'}), 404
+        return not_found(CUSTOMER_NOT_FOUND)
 
-    try:
-        data = customer_schema.load(request.json or {})
-    except ValidationError as err:
-        return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
+    data = customer_schema.load(request.json or {})
 
-    try:
-        if data.get('assigned_to') and not User.query.get(data['assigned_to']):
-            return jsonify({'message': 'Usuário responsável não encontrado'}), 400
-            
-        custom_fields_data = data.pop('custom_fields', {})
+    if data.get('assigned_to') and not record_exists(User, id=data['assigned_to']):
+        return bad_request('Usuário responsável não encontrado')
         
-        # Atualiza campos usando .get com valor padrão sendo o valor atual
-        customer.name = data.get('name', customer.name)
-        customer.email = data.get('email', customer.email)
-        customer.phone = data.get('phone', customer.phone)
-        customer.company = data.get('company', customer.company)
-        customer.address = data.get('address', customer.address)
-        customer.status = data.get('status', customer.status)
-        customer.assigned_to = data.get('assigned_to', customer.assigned_to)
-        
-        # Assume que o modelo Customer tem um método para lidar com isso
-        # Se não tiver, a lógica de resources.py precisa ser adaptada aqui
-        for field_id, value in custom_fields_data.items():
-             # Implementar a lógica de atualização de campos personalizados aqui
-             # Exemplo: customer.update_custom_field(field_id, value)
-             # Por segurança, vamos apenas logar por enquanto
-             current_app.logger.info(f"Atualizando campo {field_id} para {value} no cliente {customer_id}")
-             # Adapte conforme a implementação do seu modelo Customer
-             pass # Remova este pass e adicione a lógica real
-        
-        db.session.commit()
-        return jsonify({
-            'message': 'Cliente atualizado com sucesso',
-            'customer': customer.to_dict()
-        }), 200
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Erro ao atualizar cliente {customer_id}: {str(e)}")
-        return jsonify({'error': 'Erro ao atualizar cliente', 'details': str(e)}), 500
+    custom_fields_data = data.pop('custom_fields', {})
+    
+    # Atualiza campos usando .get com valor padrão sendo o valor atual
+    customer.name = data.get('name', customer.name)
+    customer.email = data.get('email', customer.email)
+    customer.phone = data.get('phone', customer.phone)
+    customer.company = data.get('company', customer.company)
+    customer.address = data.get('address', customer.address)
+    customer.status = data.get('status', customer.status)
+    customer.assigned_to = data.get('assigned_to', customer.assigned_to)
+    
+    _save_custom_field_values(customer.id, custom_fields_data, replace=True)
+    
+    db.session.commit()
+    return jsonify({
+        'message': 'Cliente atualizado com sucesso',
+        'customer': customer.to_dict()
+    }), 200
 
 @customers_bp.route('/<int:customer_id>', methods=['DELETE'])
 @jwt_required()
+@handle_errors('remover cliente')
 def delete_customer(customer_id):
     """Remove um cliente"""
     customer = Customer.query.get(customer_id)
     if not customer:
-        return jsonify({'message': 'Cliente não encontrado'}), 404
-        
-    try:
-        jwt_data = get_jwt()
-        user_role = jwt_data.get('role', '')
-        current_user_id_str = get_jwt_identity()
+        return not_found(CUSTOMER_NOT_FOUND)
         
-        # Permite admin ou o usuário responsável pelo cliente
-        if user_role != 'admin' and str(customer.assigned_to) != current_user_id_str:
-            return jsonify({'message': 'Permissão negada'}), 403
-            
-        # Lógica para lidar com dependências (leads, deals, etc.) pode ser necessária aqui
+    current_user_id_str, user_role = get_caller()
+    
+    # Permite admin ou o usuário responsável pelo cliente
+    if user_role != 'admin' and str(customer.assigned_to) != current_user_id_str:
+        return forbidden()
         
-        db.session.delete(customer)
-        db.session.commit()
-        return jsonify({'message': 'Cliente removido com sucesso'}), 200
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Erro ao remover cliente {customer_id}: {str(e)}")
-        return jsonify({'error': 'Erro ao remover cliente', 'details': str(e)}), 500 
\ No newline at end of file
+    # Lógica para lidar com dependências (leads, deals, etc.) pode ser necessária aqui
+    
+    db.session.delete(customer)
+    db.session.commit()
+    return jsonify({'message': 'Cliente removido com sucesso'}), 200
@@ -1,9 +1,15 @@
+import re
+
 from marshmallow import Schema, fields, validate
 
+# Validação rápida de email (formato básico usuario@dominio.tld)
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+\Z')
+
 class CustomerSchema(Schema):
     """Esquema para validação dos dados do cliente"""
     name = fields.String(required=True, validate=validate.Length(min=2, max=100))
-    email = fields.Email(required=False, allow_none=True)
+    email = fields.String(required=False, allow_none=True,
+                          validate=validate.Regexp(_EMAIL_RE, error='Not a valid email address.'))
     phone = fields.String(required=False, allow_none=True)
     company = fields.String(required=False, allow_none=True)
     address = fields.String(required=False, allow_none=True)
@@ -12,4 +18,8 @@ class CustomerSchema(Schema):
     ))
     assigned_to = fields.Integer(required=False, allow_none=True)
     # Inclui a validação para campos personalizados como um dicionário
-    custom_fields = fields.Dict(keys=fields.Integer(), values=fields.String(), required=False) 
\ No newline at end of file
+    custom_fields = fields.Dict(keys=fields.Integer(), values=fields.String(), required=False) 
+
+class StrictCustomerSchema(CustomerSchema):
+    """Esquema do cliente com a validação completa de email do marshmallow (?strict_email=1)"""
+    email = fields.Email(required=False, allow_none=True)
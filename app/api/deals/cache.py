@@ -0,0 +1,55 @@
+"""
+Cache em memória (por processo, com TTL curto e tamanho limitado) das respostas JSON de negócios.
+
+Guarda os bytes já serializados de GET /deals e GET /deals/<id>, que incluem o lead, o estágio
+e o usuário de cada negócio. As chaves incluem a versão dos dados: o maior atualizado_em de
+negócios, leads e estágios (ou, para um negócio, o atualizado_em dele, do seu lead e do seu
+estágio). Assim, criações e alterações dessas tabelas feitas em qualquer processo geram chaves
+novas.
+
+As rotas de escrita de negócios, leads, estágios e usuários invalidam o cache local. Nos demais
+processos, exclusões e alterações de usuários (a tabela users não tem atualizado_em) ficam
+visíveis após no máximo CACHE_TTL segundos; até lá, os dados aninhados podem estar desatualizados.
+"""
+
+from sqlalchemy import func, select
+
+from app import db
+from app.models.deal import Deal
+from app.models.lead import Lead
+from app.models.pipeline import PipelineStage
+from app.utils.cache import TTLCache
+
+CACHE_TTL = 30  # segundos
+CACHE_MAX_ENTRIES = 512
+
+_cache = TTLCache(CACHE_TTL, CACHE_MAX_ENTRIES)  # chave -> corpo JSON em bytes
+
+
+def list_version():
+    # Versão atual da listagem: maior atualizado_em de negócios, leads e estágios, em uma única
+    # consulta (cada MAX é servido pelo índice de atualizado_em da tabela).
+    return tuple(db.session.execute(select(
+        select(func.max(Deal.atualizado_em)).scalar_subquery(),
+        select(func.max(Lead.atualizado_em)).scalar_subquery(),
+        select(func.max(PipelineStage.atualizado_em)).scalar_subquery(),
+    )).one())
+
+
+def deal_version(deal_id):
+    # Versão atual de um negócio: o atualizado_em dele, do seu lead e do seu estágio.
+    # Retorna None se o negócio não existir.
+    row = (db.session.query(Deal.atualizado_em, Lead.atualizado_em, PipelineStage.atualizado_em)
+           .select_from(Deal)
+           .outerjoin(Deal.lead)
+           .outerjoin(Deal.pipeline_stage)
+           .filter(Deal.id == deal_id)
+           .first())
+    return None if row is None else tuple(row)
+
+
+# get(chave) -> corpo ou None; put(chave, corpo)
+get = _cache.get
+put = _cache.put
+# Descarta o cache após escrever negócios, leads, estágios ou usuários.
+invalidate = _cache.clear
@@ -1,264 +1,391 @@
-from flask import jsonify, request, current_app
+from flask import Response, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from marshmallow import ValidationError
+from sqlalchemy import exists, func, insert, literal, select, update
+from sqlalchemy.orm import joinedload
 
 from app import db
+from app.api._errors import INVALID_CURSOR, bad_request
 from app.api.deals import bp
 from app.models.deal import Deal
+from app.models.lead import Lead
 from app.models.pipeline import PipelineStage
+from app.models.user import User
+from app.utils.pagination import cursor_from_args, keyset_page
+from app.utils.decorators import handle_errors
+from app.utils.queries import record_exists, search_pattern
+from app.utils.serialization import dumps, get_json_body, ojsonify
+from app.utils.validation import FastLoader
+from . import cache as deals_cache
 from .schemas import DealSchema
 
 deal_schema = DealSchema()
 deal_update_schema = DealSchema(partial=True)
 
+# Fast validation paths for write payloads (same result and errors as the schemas above)
+deal_loader = FastLoader(deal_schema)
+deal_update_loader = FastLoader(deal_update_schema)
+
+# Relationships read by Deal.to_dict(), fetched with JOINs in a single SELECT
+# for single-deal responses.
+DEAL_DETAIL_LOAD_OPTIONS = (
+    joinedload(Deal.pipeline_stage),
+    joinedload(Deal.lead),
+    joinedload(Deal.usuario),
+)
+
+
+# Columns of the list SELECT: the deal plus its stage, lead and user through LEFT JOINs,
+# so a page is a single query returning plain rows (no ORM objects are built).
+_DEAL_LIST_COLUMNS = (
+    Deal.id, Deal.title, Deal.value, Deal.description, Deal.pipeline_stage_id, Deal.probability,
+    Deal.expected_close_date, Deal.closed_date, Deal.status, Deal.lead_id, Deal.usuario_id,
+    Deal.criado_em, Deal.atualizado_em,
+    PipelineStage.id.label('ps_id'), PipelineStage.name.label('ps_name'),
+    PipelineStage.description.label('ps_description'), PipelineStage.order.label('ps_order'),
+    PipelineStage.color.label('ps_color'), PipelineStage.pipeline_id.label('ps_pipeline_id'),
+    PipelineStage.is_system.label('ps_is_system'), PipelineStage.criado_em.label('ps_criado_em'),
+    PipelineStage.atualizado_em.label('ps_atualizado_em'),
+    Lead.id.label('lead_pk'), Lead.nome.label('lead_nome'), Lead.email.label('lead_email'),
+    User.id.label('u_id'), User.name.label('u_name'), User.username.label('u_username'),
+    User.email.label('u_email'), User.role.label('u_role'), User.created_at.label('u_created_at'),
+)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _deal_list_query():
+    # Base query of the deals list (see _DEAL_LIST_COLUMNS).
+    return (db.session.query(*_DEAL_LIST_COLUMNS)
+            .select_from(Deal)
+            .outerjoin(Deal.pipeline_stage)
+            .outerjoin(Deal.lead)
+            .outerjoin(Deal.usuario))
+
+
+def _deal_row_to_dict(row):
+    # Builds, from a _deal_list_query() row, the same dict as Deal.to_dict().
+    return {
+        'id': row.id,
+        'title': row.title,
+        'value': row.value,
+        'description': row.description or '',
+        'pipeline_stage_id': row.pipeline_stage_id,
+        'pipeline_stage': None if row.ps_id is None else {
+            'id': row.ps_id,
+            'name': row.ps_name,
+            'description': row.ps_description or '',
+            'order': row.ps_order,
+            'color': row.ps_color,
+            'pipeline_id': row.ps_pipeline_id,
+            'is_system': row.ps_is_system,
+            'criado_em': _iso(row.ps_criado_em),
+            'atualizado_em': _iso(row.ps_atualizado_em)
+        },
+        'probability': row.probability,
+        'expected_close_date': _iso(row.expected_close_date),
+        'closed_date': _iso(row.closed_date),
+        'status': row.status,
+        'lead_id': row.lead_id,
+        'lead': None if row.lead_pk is None else {
+            'id': row.lead_pk,
+            'nome': row.lead_nome,
+            'email': row.lead_email
+        },
+        'usuario_id': row.usuario_id,
+        'usuario': None if row.u_id is None else {
+            'id': row.u_id,
+            'name': row.u_name,
+            'username': row.u_username,
+            'email': row.u_email,
+            'role': row.u_role,
+            'created_at': row.u_created_at.strftime('%Y-%m-%d %H:%M:%S') if row.u_created_at else None
+        },
+        'criado_em': _iso(row.criado_em),
+        'atualizado_em': _iso(row.atualizado_em)
+    }
+
+
+def _stage_filter(value, args):
+    # Filter by pipeline stage (an invalid id is ignored)
+    try:
+        return Deal.pipeline_stage_id == int(value)
+    except ValueError:
+        return None
+
+
+def _title_filter(value, args):
+    # Filter by title (partial search)
+    # lower(title) LIKE lower(pattern) is served by the GIN trigram index on lower(title);
+    # anchored=true restricts the match to a title prefix
+    anchored = args.get('anchored') == 'true'
+    return func.lower(Deal.title).like(search_pattern(value.lower(), anchored=anchored))
+
+
+def _status_filter(value, args):
+    # Filter by status (exact match)
+    return Deal.status == value
+
+
+def _owner_filter(value, args):
+    # Filter by responsible user: an id, or 'me' for the authenticated user (an invalid id is ignored)
+    if value == 'me':
+        value = get_jwt_identity()
+    try:
+        return Deal.usuario_id == int(value)
+    except ValueError:
+        return None
+
+
+# Deals list filters: query arg -> builder of the WHERE clause from the (non-empty) arg value.
+# The builder returns None to ignore an invalid value.
+DEAL_FILTERS = {
+    'pipeline_stage_id': _stage_filter,
+    'title': _title_filter,
+    'status': _status_filter,
+    'usuario_id': _owner_filter,
+}
+
+
+def _cached_response(cache_key, result):
+    # Serializes the response once and keeps the bytes in the deals cache.
+    body = dumps(result)
+    deals_cache.put(cache_key, body)
+    return Response(body, mimetype='application/json')
+
+
+def _load_deal(id):
+    # Loads a deal with the relationships used by to_dict() (also refreshes a deal
+    # expired by a previous commit). Returns None if it does not exist.
+    return db.session.get(Deal, id, options=DEAL_DETAIL_LOAD_OPTIONS, populate_existing=True)
+
+
+def _set_deal_stage(id, stage_id):
+    # Moves the deal to the stage in a single round-trip:
+    # UPDATE deals ... WHERE id = :id AND EXISTS (SELECT 1 FROM pipeline_stages WHERE id = :sid) RETURNING id.
+    # Returns False if no row was updated (the deal or the stage does not exist).
+    stmt = (update(Deal)
+            .where(Deal.id == id, exists().where(PipelineStage.id == stage_id))
+            .values(pipeline_stage_id=stage_id)
+            .returning(Deal.id)
+            .execution_options(synchronize_session=False))
+    return db.session.execute(stmt).first() is not None
+
+
+def _insert_deal(values):
+    # Inserts the deal in a single round-trip, only if its pipeline stage exists:
+    # INSERT INTO deals (...) SELECT :values WHERE EXISTS (SELECT 1 FROM pipeline_stages ...) RETURNING id.
+    # Column defaults (status, criado_em, ...) are included in the statement.
+    # Returns the new deal id, or None if the stage does not exist.
+    columns = [getattr(Deal, name) for name in values]
+    select_values = (select(*(literal(value, type_=column.type) for column, value in zip(columns, values.values())))
+                     .where(exists().where(PipelineStage.id == values['pipeline_stage_id'])))
+    stmt = insert(Deal).from_select(list(values), select_values).returning(Deal.id)
+    row = db.session.execute(stmt).first()
+    return None if row is None else row[0]
+
+
+def _stage_update_failed(id):
+    # Response for a stage update that matched no row: 404 if the deal is missing, 400 otherwise.
+    db.session.rollback()
+    if not record_exists(Deal, id=id):
+        return ojsonify({'error': 'Deal not found'}, 404)
+    return ojsonify({'error': 'Invalid pipeline stage'}, 400)
+
+
 @bp.route('/', methods=['GET'])
 @jwt_required()
+@handle_errors('listar deals')
 def get_deals():
     """Get all deals."""
+    current_user_id = get_jwt_identity()
+    args = request.args
+    
+    # Pagination parameters: keyset (default) or legacy page/offset when 'page' is given
+    page = args.get('page', type=int)
+    per_page = min(args.get('per_page', 10, type=int), 100)
+    
     try:
-        # Verify token and get user ID
-        current_user_id = get_jwt_identity()
-        current_app.logger.info(f"Token validated successfully. User ID: {current_user_id}")
-        
-        # Pagination parameters with extra validation
-        try:
-            page = request.args.get('page', 1, type=int)
-            per_page = min(request.args.get('per_page', 10, type=int), 100)
-            current_app.logger.info(f"Pagination parameters: page={page}, per_page={per_page}")
-        except Exception as e:
-            current_app.logger.error(f"Error processing pagination parameters: {str(e)}")
-            page = 1
-            per_page = 10
-        
-        # Basic query for diagnostics
-        try:
-            query = Deal.query
-            
-            # Process filters
-            current_app.logger.info(f"Request args: {request.args}")
-            
-            # Filter by pipeline stage
-            if request.args.get('pipeline_stage_id'):
-                try:
-                    stage_id = int(request.args.get('pipeline_stage_id'))
-                    query = query.filter(Deal.pipeline_stage_id == stage_id)
-                    current_app.logger.info(f"Filtering by pipeline stage: {stage_id}")
-                except ValueError:
-                    current_app.logger.error("Invalid pipeline_stage_id format")
-            
-            # Filter by title (partial search)
-            if request.args.get('title'):
-                title_query = f"%{request.args.get('title')}%"
-                query = query.filter(Deal.title.ilike(title_query))
-                current_app.logger.info(f"Filtering by title: {title_query}")
-            
-            # Filter by status (exact match)
-            if request.args.get('status'):
-                query = query.filter(Deal.status == request.args.get('status'))
-                current_app.logger.info(f"Filtering by status: {request.args.get('status')}")
-            
-            # Order by creation date, from most recent to oldest
-            query = query.order_by(Deal.criado_em.desc())
-            
-            # Simple test with a limit before paginating
-            deals_count = query.count()
-            current_app.logger.info(f"Total deals found after applying filters: {deals_count}")
-            
-            # Paginate the results
-            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-            deals = pagination.items
-            current_app.logger.info(f"Pagination successful. {len(deals)} deals on page {page}")
-            
-            # Build response carefully
-            deal_list = []
-            for deal in deals:
-                try:
-                    deal_dict = deal.to_dict()
-                    deal_list.append(deal_dict)
-                except Exception as e:
-                    current_app.logger.error(f"Error processing deal {deal.id}: {str(e)}")
-            
-            result = {
-                'items': deal_list,
-                'total': pagination.total,
-                'pages': pagination.pages,
-                'page': page,
-                'per_page': per_page
-            }
-            
-            current_app.logger.info("Response prepared successfully")
-            return jsonify(result)
-            
-        except Exception as e:
-            current_app.logger.error(f"Error querying the database: {str(e)}")
-            return jsonify({'error': 'Error querying deals from the database', 'details': str(e)}), 500
-            
-    except Exception as e:
-        current_app.logger.error(f"Global error when listing deals: {str(e)}")
-        return jsonify({'error': 'Error listing deals', 'details': str(e)}), 500
+        # Keyset position: 'cursor', or 'after_criado_em' + 'after_id'
+        cursor_key = cursor_from_args(args, 'after_criado_em')
+    except ValueError:
+        return bad_request(INVALID_CURSOR)
+    
+    # Serve the already-serialized response when nothing changed since it was cached
+    cache_key = (current_user_id, tuple(sorted(args.items(multi=True))), deals_cache.list_version())
+    cached = deals_cache.get(cache_key)
+    if cached is not None:
+        return Response(cached, mimetype='application/json')
+    
+    query = _deal_list_query()
+    
+    # Filters (see DEAL_FILTERS)
+    for name, build_filter in DEAL_FILTERS.items():
+        value = args.get(name)
+        if value:
+            clause = build_filter(value, args)
+            if clause is not None:
+                query = query.filter(clause)
+    
+    if page is None or cursor_key is not None:
+        # Keyset pagination on the (criado_em DESC, id DESC) index: no COUNT(*) and no OFFSET.
+        # One extra row is fetched only to know whether there is a next page.
+        deals, next_cursor = keyset_page(query, Deal.criado_em, Deal.id, per_page, cursor_key)
+        return _cached_response(cache_key, {
+            'items': [_deal_row_to_dict(row) for row in deals],
+            'per_page': per_page,
+            'has_next': next_cursor is not None,
+            'next_cursor': next_cursor
+        })
+    
+    # Legacy page/offset pagination (with total), kept for existing clients
+    query = query.order_by(Deal.criado_em.desc(), Deal.id.desc())
+    
+    if args.get('count', 'true').lower() == 'false':
+        # Without COUNT(*): one extra row is fetched only to know whether there is a next page
+        page = max(page, 1)
+        rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+        return _cached_response(cache_key, {
+            'items': [_deal_row_to_dict(row) for row in rows[:per_page]],
+            'page': page,
+            'per_page': per_page,
+            'has_more': len(rows) > per_page
+        })
+    
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    
+    return _cached_response(cache_key, {
+        'items': [_deal_row_to_dict(row) for row in pagination.items],
+        'total': pagination.total,
+        'pages': pagination.pages,
+        'page': page,
+        'per_page': per_page
+    })
 
 @bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
+@handle_errors('buscar deal')
 def get_deal(id):
     """Get a specific deal by ID."""
-    try:
-        deal = Deal.query.get(id)
-        if not deal:
-            return jsonify({'error': 'Deal not found'}), 404
-            
-        return jsonify(deal.to_dict())
-    except Exception as e:
-        current_app.logger.error(f"Error fetching deal: {str(e)}")
-        return jsonify({'error': 'Error fetching deal', 'details': str(e)}), 500
+    # The key changes whenever the deal is updated (atualizado_em)
+    version = deals_cache.deal_version(id)
+    if version is None:
+        return ojsonify({'error': 'Deal not found'}, 404)
+    cache_key = ('deal', id, version)
+    cached = deals_cache.get(cache_key)
+    if cached is not None:
+        return Response(cached, mimetype='application/json')
+    
+    deal = _load_deal(id)
+    if not deal:
+        return ojsonify({'error': 'Deal not found'}, 404)
+        
+    return _cached_response(cache_key, deal.to_dict())
 
 @bp.route('/', methods=['POST'])
 @jwt_required()
+@handle_errors('criar deal')
 def create_deal():
     """Create a new deal using schema validation."""
-    try:
-        # Valida os dados usando o schema
-        data = deal_schema.load(request.json or {})
-    except ValidationError as err:
-        return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
+    # Valida os dados usando o schema
+    data = deal_loader.load(get_json_body())
 
-    try:
-        # Verifica se o pipeline stage existe (após validação do tipo)
-        pipeline_stage = PipelineStage.query.get(data['pipeline_stage_id'])
-        if not pipeline_stage:
-            # Retorna erro específico se o stage não for encontrado
-            return jsonify({'message': 'Pipeline stage inválido', 'errors': {'pipeline_stage_id': ['Estágio do pipeline não encontrado.']}}), 400
-        
-        # Cria o deal usando os dados validados
-        # O método from_dict pode precisar de ajuste se não esperar objetos Date diretamente
-        # Mas como DealSchema já converte para Date, vamos tentar direto
-        deal = Deal(**data) # Passa dados validados diretamente para o construtor
-        
-        # Define o usuário que criou o deal
-        current_user_id = get_jwt_identity()
-        deal.usuario_id = current_user_id
-            
-        db.session.add(deal)
-        db.session.commit()
-        
-        return jsonify(deal.to_dict()), 201
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Erro ao criar deal: {str(e)}")
-        return jsonify({'error': 'Erro ao criar deal', 'details': str(e)}), 500
+    # Define o usuário que criou o deal
+    data['usuario_id'] = get_jwt_identity()
+    
+    # Insere o deal validando a existência do estágio no mesmo comando
+    deal_id = _insert_deal(data)
+    if deal_id is None:
+        # Retorna erro específico se o stage não for encontrado
+        return ojsonify({'message': 'Pipeline stage inválido', 'errors': {'pipeline_stage_id': ['Estágio do pipeline não encontrado.']}}, 400)
+    db.session.commit()
+    deals_cache.invalidate()
+    
+    return ojsonify(_load_deal(deal_id).to_dict(), 201)
 
 @bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
+@handle_errors('atualizar deal')
 def update_deal(id):
     """Update an existing deal using schema validation."""
-    deal = Deal.query.get(id)
+    deal = db.session.get(Deal, id)
     if not deal:
-        return jsonify({'error': 'Deal not found'}), 404
-            
-    try:
-        # Valida os dados usando o schema de atualização (partial=True)
-        data = deal_update_schema.load(request.json or {})
-    except ValidationError as err:
-        return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
+        return ojsonify({'error': 'Deal not found'}, 404)
+    
+    # Valida os dados usando o schema de atualização (partial=True)
+    data = deal_update_loader.load(get_json_body())
 
-    try:
-        # Verifica se o pipeline stage existe, se fornecido
-        if 'pipeline_stage_id' in data:
-            pipeline_stage = PipelineStage.query.get(data['pipeline_stage_id'])
-            if not pipeline_stage:
-                 return jsonify({'message': 'Pipeline stage inválido', 'errors': {'pipeline_stage_id': ['Estágio do pipeline não encontrado.']}}), 400
-        
-        # Atualiza os campos do deal com os dados validados
-        for field, value in data.items():
-            setattr(deal, field, value)
-        
-        # Não atualizamos usuario_id aqui, a menos que seja um requisito específico
-        
-        db.session.commit()
-        
-        return jsonify(deal.to_dict())
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error updating deal {id}: {str(e)}")
-        return jsonify({'error': 'Error updating deal', 'details': str(e)}), 500
+    # Verifica se o pipeline stage existe, se fornecido
+    if 'pipeline_stage_id' in data:
+        if not record_exists(PipelineStage, id=data['pipeline_stage_id']):
+             return ojsonify({'message': 'Pipeline stage inválido', 'errors': {'pipeline_stage_id': ['Estágio do pipeline não encontrado.']}}, 400)
+    
+    # Atualiza os campos do deal com os dados validados
+    for field, value in data.items():
+        setattr(deal, field, value)
+    
+    # Não atualizamos usuario_id aqui, a menos que seja um requisito específico
+    
+    db.session.commit()
+    deals_cache.invalidate()
+    
+    return ojsonify(_load_deal(deal.id).to_dict())
 
 @bp.route('/<int:id>', methods=['DELETE'])
 @jwt_required()
+@handle_errors('excluir deal')
 def delete_deal(id):
     """Delete a deal by ID."""
-    try:
-        deal = Deal.query.get(id)
-        if not deal:
-            return jsonify({'error': 'Deal not found'}), 404
-            
-        db.session.delete(deal)
-        db.session.commit()
+    deal = db.session.get(Deal, id)
+    if not deal:
+        return ojsonify({'error': 'Deal not found'}, 404)
         
-        return jsonify({'message': 'Deal deleted successfully'})
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error deleting deal: {str(e)}")
-        return jsonify({'error': 'Error deleting deal', 'details': str(e)}), 500
+    db.session.delete(deal)
+    db.session.commit()
+    deals_cache.invalidate()
+    
+    return ojsonify({'message': 'Deal deleted successfully'})
 
 @bp.route('/<int:id>/move', methods=['PUT'])
 @jwt_required()
+@handle_errors('mover deal')
 def move_deal(id):
     """Move a deal to a different pipeline stage."""
-    try:
-        deal = Deal.query.get(id)
-        if not deal:
-            return jsonify({'error': 'Deal not found'}), 404
-            
-        data = request.get_json() or {}
-        
-        if not data or 'stageId' not in data:
-            return jsonify({'error': 'Pipeline stage ID is required'}), 400
-        
-        # Verify if the pipeline stage exists
-        new_stage_id = data['stageId']
-        # Validação do tipo stageId
-        if not isinstance(new_stage_id, int):
-             return jsonify({'error': 'stageId must be an integer'}), 400
-             
-        pipeline_stage = PipelineStage.query.get(new_stage_id)
-        if not pipeline_stage:
-            return jsonify({'error': 'Invalid pipeline stage'}), 400
-        
-        # Update the deal with the new stage
-        deal.pipeline_stage_id = new_stage_id
-        db.session.commit()
-        
-        return jsonify(deal.to_dict())
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error moving deal: {str(e)}")
-        return jsonify({'error': 'Error moving deal', 'details': str(e)}), 500
+    # The body has a single field: read it directly, without a schema
+    data = get_json_body()
+    new_stage_id = data.get('stageId') if isinstance(data, dict) else None
+    if new_stage_id is None:
+        return ojsonify({'error': 'Pipeline stage ID is required'}, 400)
+    # Validação do tipo stageId (bool não é aceito)
+    if type(new_stage_id) is not int:
+        return ojsonify({'error': 'stageId must be an integer'}, 400)
+    
+    # Update the deal with the new stage (the stage existence is checked in the same statement)
+    if not _set_deal_stage(id, new_stage_id):
+        return _stage_update_failed(id)
+    db.session.commit()
+    deals_cache.invalidate()
+    
+    return ojsonify(_load_deal(id).to_dict())
 
 @bp.route('/<int:id>/stage', methods=['PUT'])
 @jwt_required()
+@handle_errors('atualizar estágio do deal')
 def update_deal_stage(id):
     """Update a deal's pipeline stage."""
-    try:
-        deal = Deal.query.get(id)
-        if not deal:
-            return jsonify({'error': 'Deal not found'}), 404
-        
-        # Validate data
-        data = request.json
-        if not data or 'pipeline_stage_id' not in data:
-            return jsonify({'error': 'Pipeline stage ID required'}), 400
-        
-        # Check if the stage exists
-        pipeline_stage = PipelineStage.query.get(data['pipeline_stage_id'])
-        if not pipeline_stage:
-            return jsonify({'error': 'Invalid pipeline stage'}), 400
-            
-        # Update stage
-        deal.pipeline_stage_id = data['pipeline_stage_id']
-        
-        db.session.commit()
-        
-        return jsonify(deal.to_dict())
-    except Exception as e:
-        db.session.rollback()
-        current_app.logger.error(f"Error updating deal stage: {str(e)}")
-        return jsonify({'error': 'Error updating deal stage', 'details': str(e)}), 500 
\ No newline at end of file
+    # Validate data
+    data = get_json_body()
+    new_stage_id = data.get('pipeline_stage_id') if isinstance(data, dict) else None
+    if new_stage_id is None:
+        return ojsonify({'error': 'Pipeline stage ID required'}, 400)
+    if type(new_stage_id) is not int:
+        return ojsonify({'error': 'pipeline_stage_id must be an integer'}, 400)
+    
+    # Update stage (the stage existence is checked in the same statement)
+    if not _set_deal_stage(id, new_stage_id):
+        return _stage_update_failed(id)
+    db.session.commit()
+    deals_cache.invalidate()
+    
+    return ojsonify(_load_deal(id).to_dict())
@@ -1,7 +1,11 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import EXCLUDE, Schema, fields, validate
 
 class DealSchema(Schema):
     """Esquema para validação dos dados de Deal"""
+    class Meta:
+        # Campos desconhecidos (ex: 'id', 'pipeline_stage' enviados de volta pelo cliente) são ignorados
+        unknown = EXCLUDE
+
     title = fields.String(required=True, validate=validate.Length(min=1, max=100))
     value = fields.Float(required=False, allow_none=True, validate=validate.Range(min=0))
     description = fields.String(required=False, allow_none=True)
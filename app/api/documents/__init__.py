@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-documents_bp = Blueprint('documents', __name__, url_prefix='/documents')
+documents_bp = Blueprint('documents', __name__)
 
 from . import routes
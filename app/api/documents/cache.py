@@ -0,0 +1,29 @@
+"""
+Cache em memória (por processo, com TTL curto e tamanho limitado) das respostas de GET /documents.
+
+As chaves incluem a versão dos dados (maior updated_at da tabela), como no cache de negócios.
+Cada item traz também o nome de quem fez o upload (users.name), que não entra na versão:
+as rotas de usuários invalidam o cache local, mas, nos demais processos, renomeações de
+usuários (assim como exclusões de documentos) ficam visíveis após no máximo CACHE_TTL segundos.
+"""
+
+from app import db
+from app.models.document import Document
+from app.utils.cache import TTLCache
+
+CACHE_TTL = 60  # segundos
+CACHE_MAX_ENTRIES = 256
+
+_cache = TTLCache(CACHE_TTL, CACHE_MAX_ENTRIES)  # chave -> corpo JSON em bytes
+
+
+def list_version():
+    # Versão atual da listagem: maior updated_at da tabela (consulta servida pelo índice).
+    return db.session.query(db.func.max(Document.updated_at)).scalar()
+
+
+# get(chave) -> corpo ou None; put(chave, corpo)
+get = _cache.get
+put = _cache.put
+# Descarta o cache após enviar, atualizar, compartilhar, migrar ou remover documentos.
+invalidate = _cache.clear
@@ -1,19 +1,135 @@
-from flask import request, jsonify, current_app, send_file
+from flask import Response, request, jsonify, current_app, redirect, send_file
 from marshmallow import ValidationError
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended import jwt_required
+import hashlib
 import os
 import uuid
 from datetime import datetime
 import mimetypes
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import or_, update
+from sqlalchemy.orm import joinedload, raiseload
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 
 from app import db
+from app.api._errors import INVALID_CURSOR, bad_request
 from app.models import Document, User
+from app.models.document import DOCUMENT_EXTENSIONS, IMAGE_EXTENSIONS, file_extension
+from app.utils.auth import get_caller
+from app.utils.pagination import cursor_position, decode_cursor, keyset_page
+from app.utils.queries import search_pattern
+from app.utils.serialization import dumps
+from app.utils.supabase_client import SupabaseManager
+from app.utils.uploads import delete_files_later, get_upload_dir, save_stream, save_upload
+from . import cache as documents_cache
 from . import documents_bp
-from .schemas import DocumentSchema
+from .schemas import DocumentSchema, validate_entity_id
 
 document_schema = DocumentSchema()
-documents_schema = DocumentSchema(many=True)
+
+# Validade (segundos) das URLs assinadas do Supabase usadas nos downloads
+SIGNED_URL_EXPIRES_IN = 300
+
+# Uploads simultâneos na migração para o Supabase (padrão e limite do parâmetro 'workers')
+MIGRATION_WORKERS = 8
+MAX_MIGRATION_WORKERS = 16
+
+# Uploader usado por Document.to_dict() (uploader_name), carregado no mesmo SELECT nas rotas de
+# um documento; qualquer outro relacionamento acessado gera erro em vez de um SELECT extra silencioso
+DOCUMENT_LOAD_OPTIONS = (
+    joinedload(Document.uploader).load_only(User.id, User.name),
+    raiseload('*'),
+)
+
+
+def _load_document(document_id):
+    # Carrega um documento pelo ID (ou None) com DOCUMENT_LOAD_OPTIONS.
+    return db.session.get(Document, document_id, options=DOCUMENT_LOAD_OPTIONS)
+
+
+# Colunas do SELECT da listagem: o documento e o nome de quem fez o upload (LEFT JOIN),
+# para que uma página seja uma única consulta retornando linhas simples (sem objetos ORM).
+_DOCUMENT_LIST_COLUMNS = (
+    Document.id, Document.filename, Document.original_filename, Document.file_size,
+    Document.file_type, Document.title, Document.description, Document.entity_type,
+    Document.entity_id, Document.communication_id, Document.uploaded_by, Document.is_public,
+    Document.use_supabase, Document.storage_bucket, Document.storage_path,
+    Document.created_at, Document.updated_at,
+    User.name.label('uploader_name'),
+)
+
+
+# Colunas usadas pela busca textual (parâmetro 'search')
+_DOCUMENT_SEARCH_COLS = (Document.title, Document.description, Document.original_filename)
+
+
+def _document_list_query():
+    # Consulta base da listagem de documentos (ver _DOCUMENT_LIST_COLUMNS).
+    return (db.session.query(*_DOCUMENT_LIST_COLUMNS)
+            .select_from(Document)
+            .outerjoin(Document.uploader))
+
+
+def _document_row_to_dict(row):
+    # Monta, a partir de uma linha de _document_list_query(), o mesmo dicionário de
+    # Document.to_dict(include_content=False).
+    extension = file_extension(row.original_filename)
+    data = {
+        'id': row.id,
+        'filename': row.filename,
+        'original_filename': row.original_filename,
+        'file_size': row.file_size,
+        'file_type': row.file_type,
+        'extension': extension,
+        'title': row.title,
+        'description': row.description,
+        'entity_type': row.entity_type,
+        'entity_id': row.entity_id,
+        'communication_id': row.communication_id,
+        'uploaded_by': row.uploaded_by,
+        'uploader_name': row.uploader_name,
+        'is_public': row.is_public,
+        'is_image': extension in IMAGE_EXTENSIONS,
+        'is_document': extension in DOCUMENT_EXTENSIONS,
+        'use_supabase': row.use_supabase,
+        'created_at': row.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'updated_at': row.updated_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    if row.use_supabase:
+        data['public_url'] = _public_url(row.storage_bucket, row.storage_path)
+    return data
+
+
+def _public_url(bucket, storage_path):
+    # URL pública no Supabase (como Document.get_supabase_url)
+    if not bucket or not storage_path:
+        return None
+    try:
+        return SupabaseManager().get_public_url(storage_path, bucket)
+    except Exception:
+        return None
+
+def _document_cursor(args):
+    # Lê a posição da página anterior na query string: o 'cursor' opaco (next_cursor da
+    # resposta anterior) ou 'after=<created_at ISO 8601>,<id>'. Retorna None na primeira página.
+    # Lança ValueError se a posição for inválida.
+    cursor = args.get('cursor')
+    if cursor:
+        return decode_cursor(cursor)
+    after = args.get('after')
+    if not after:
+        return None
+    created_at, last_id = after.rsplit(',', 1)
+    return cursor_position(created_at, last_id)
+
+
+def _cached_response(cache_key, result):
+    # Serializa a resposta uma única vez e guarda os bytes no cache da listagem.
+    body = dumps(result)
+    documents_cache.put(cache_key, body)
+    return Response(body, mimetype='application/json')
+
 
 @documents_bp.route('/', methods=['GET'])
 @jwt_required()
@@ -29,11 +145,23 @@ def get_documents():
         uploaded_by = request.args.get('uploaded_by')
         search = request.args.get('search')
         
-        # Parâmetros de paginação
-        page = request.args.get('page', 1, type=int)
+        # Parâmetros de paginação: por cursor (padrão) ou por página, se 'page' for informado
+        page = request.args.get('page', type=int)
         per_page = min(request.args.get('per_page', 20, type=int), 100)
+        include_total = request.args.get('include_total') == '1'
+        try:
+            cursor_key = _document_cursor(request.args)
+        except ValueError:
+            return bad_request(INVALID_CURSOR)
         
-        query = Document.query
+        # Resposta já serializada, se nada mudou desde que foi guardada
+        # (a listagem não depende do usuário, então a chave usa apenas os parâmetros)
+        cache_key = (tuple(sorted(request.args.items(multi=True))), documents_cache.list_version())
+        cached = documents_cache.get(cache_key)
+        if cached is not None:
+            return Response(cached, mimetype='application/json')
+        
+        query = _document_list_query()
         
         # Aplicar filtros
         if entity_type:
@@ -50,35 +178,139 @@ def get_documents():
         if uploaded_by:
             query = query.filter(Document.uploaded_by == uploaded_by)
         if search:
-            search_term = f"%{search}%"
-            query = query.filter(
-                Document.title.ilike(search_term) | 
-                Document.description.ilike(search_term) |
-                Document.original_filename.ilike(search_term)
-            )
-        
-        # Ordenação padrão: documentos mais recentes primeiro
-        query = query.order_by(Document.created_at.desc())
-        
-        # Executar a consulta paginada
-        paginated_docs = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        # Preparar a resposta
-        return jsonify({
-            'documents': [doc.to_dict(include_content=False) for doc in paginated_docs.items],
-            'pagination': {
-                'total_items': paginated_docs.total,
-                'total_pages': paginated_docs.pages,
-                'current_page': paginated_docs.page,
-                'per_page': paginated_docs.per_page,
-                'has_next': paginated_docs.has_next,
-                'has_prev': paginated_docs.has_prev
+            # ILIKE '%termo%' servido pelos índices GIN de trigramas (pg_trgm) de cada coluna
+            search_term = search_pattern(search)
+            query = query.filter(or_(*(col.ilike(search_term) for col in _DOCUMENT_SEARCH_COLS)))
+        
+        if page is None or cursor_key is not None:
+            # Paginação por cursor: busca por intervalo no índice (created_at DESC, id DESC),
+            # sem COUNT(*) nem OFFSET. O total só é calculado se include_total=1.
+            total = query.count() if include_total else None
+            docs, next_cursor = keyset_page(query, Document.created_at, Document.id,
+                                            per_page, cursor_key)
+            pagination = {
+                'per_page': per_page,
+                'has_next': next_cursor is not None,
+                'next_cursor': next_cursor
             }
-        }), 200
+            if include_total:
+                pagination['total_items'] = total
+            
+            return _cached_response(cache_key, {
+                'documents': [_document_row_to_dict(row) for row in docs],
+                'pagination': pagination
+            })
+        
+        # Paginação por página: uma linha extra indica se há próxima página, sem COUNT(*)
+        # (o total só é calculado se include_total=1)
+        page = max(page, 1)
+        query = query.order_by(Document.created_at.desc(), Document.id.desc())
+        rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+        pagination = {
+            'current_page': page,
+            'per_page': per_page,
+            'has_next': len(rows) > per_page,
+            'has_prev': page > 1
+        }
+        if include_total:
+            total = query.order_by(None).count()
+            pagination['total_items'] = total
+            pagination['total_pages'] = -(-total // per_page)
+        
+        return _cached_response(cache_key, {
+            'documents': [_document_row_to_dict(row) for row in rows[:per_page]],
+            'pagination': pagination
+        })
     except Exception as e:
         current_app.logger.error(f"Erro ao listar documentos: {str(e)}")
         return jsonify({'error': 'Erro ao listar documentos', 'details': str(e)}), 500
 
+def _unique_filename(original_filename):
+    # Gera o nome único do arquivo salvo em disco, mantendo a extensão original
+    extension = os.path.splitext(original_filename)[1]
+    unique_id = str(uuid.uuid4())
+    return f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{unique_id}{extension}"
+
+
+def _dedupe_file(file_path, file_size, content_sha256):
+    # Se outro documento local já tiver o mesmo conteúdo (hash e tamanho), substitui o arquivo
+    # recém-gravado por um hard link para o existente, sem ocupar espaço em disco de novo.
+    # Os arquivos continuam independentes para exclusão (cada documento tem seu próprio link).
+    existing_path = db.session.query(Document.file_path).filter(
+        Document.content_sha256 == content_sha256,
+        Document.file_size == file_size
+    ).limit(1).scalar()
+    if not existing_path or existing_path == file_path:
+        return
+    try:
+        if os.path.samefile(existing_path, file_path):
+            return
+        temp_path = file_path + '.link'
+        os.link(existing_path, temp_path)
+        os.replace(temp_path, file_path)
+    except OSError:
+        # Arquivo existente ausente, outro sistema de arquivos ou sem suporte a hard links:
+        # mantém a cópia gravada
+        pass
+
+
+def _store_document(file_path, filename, original_filename, file_size, file_type,
+                    validated_data, use_supabase, bucket_name, content_sha256=None):
+    # Cria o registro do documento já gravado em disco e, se solicitado, envia o arquivo ao Supabase.
+    # Retorna a resposta 201 do upload.
+    if content_sha256:
+        _dedupe_file(file_path, file_size, content_sha256)
+    
+    current_user_id, _ = get_caller()
+    document = Document(
+        filename=filename,
+        original_filename=original_filename,
+        file_path=file_path,
+        file_size=file_size,
+        file_type=file_type,
+        content_sha256=content_sha256,
+        title=validated_data.get('title') or original_filename,
+        description=validated_data.get('description'),
+        entity_type=validated_data.get('entity_type'),
+        entity_id=validated_data.get('entity_id'),
+        communication_id=validated_data.get('communication_id'),
+        uploaded_by=current_user_id,
+        is_public=validated_data.get('is_public', False),
+        access_code=validated_data.get('access_code'),
+        use_supabase=use_supabase
+    )
+    
+    db.session.add(document)
+    db.session.flush()  # Obter ID sem commit
+    
+    # Se for usar Supabase Storage, fazer upload do arquivo
+    supabase_success = False
+    if use_supabase:
+        supabase_success = document.upload_to_supabase(bucket_name)
+        
+        if not supabase_success:
+            current_app.logger.warning(f"Falha ao fazer upload para o Supabase. Usando armazenamento local para o documento {document.id}")
+            document.use_supabase = False
+    
+    db.session.commit()
+    documents_cache.invalidate()
+    
+    response_data = {
+        'message': 'Documento enviado com sucesso',
+        'document': document.to_dict(include_content=False)
+    }
+    
+    if use_supabase:
+        if supabase_success:
+            response_data['storage'] = 'supabase'
+            response_data['public_url'] = document.get_supabase_url()
+        else:
+            response_data['storage'] = 'local'
+            response_data['warning'] = 'Falha ao fazer upload para o Supabase. Usando armazenamento local.'
+    
+    return jsonify(response_data), 201
+
+
 @documents_bp.route('/', methods=['POST'])
 @jwt_required()
 def upload_document():
@@ -95,103 +327,101 @@ def upload_document():
         # Obter dados do formulário
         data = request.form.to_dict()
         
-        # Configurar contexto para validação
-        document_schema.context = {
-            'entity_type': data.get('entity_type')
-        }
-        
         # Validar dados com o schema
         validated_data = document_schema.load(data, partial=True)
     except ValidationError as err:
         return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
 
     try:
-        # Obter o usuário atual
-        current_user_id = get_jwt_identity()
-        
         # Gerar nome de arquivo único
         original_filename = secure_filename(file.filename)
-        extension = os.path.splitext(original_filename)[1]
-        unique_id = str(uuid.uuid4())
-        filename = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{unique_id}{extension}"
+        filename = _unique_filename(original_filename)
         
         # Verificar se deve usar Supabase Storage
         use_supabase = data.get('use_supabase', 'false').lower() == 'true'
         
-        # Definir diretório de uploads local
-        upload_dir = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'documents')
-        os.makedirs(upload_dir, exist_ok=True)
+        # Definir diretório de uploads local (criado no primeiro upload)
+        upload_dir = get_upload_dir('documents')
         
         # Caminho completo do arquivo local (sempre salvar local primeiro)
         file_path = os.path.join(upload_dir, filename)
         
-        # Salvar o arquivo localmente
-        file.save(file_path)
-        
-        # Determinar o tipo MIME se não for fornecido pelo cliente
-        file_type = file.content_type
-        if not file_type:
-            file_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
-        
-        # Obter tamanho do arquivo
-        file_size = os.path.getsize(file_path)
-        
-        # Criar documento no banco de dados
-        document = Document(
-            filename=filename,
-            original_filename=original_filename,
-            file_path=file_path,
-            file_size=file_size,
-            file_type=file_type,
-            title=validated_data.get('title') or original_filename,
-            description=validated_data.get('description'),
-            entity_type=validated_data.get('entity_type'),
-            entity_id=validated_data.get('entity_id'),
-            communication_id=validated_data.get('communication_id'),
-            uploaded_by=current_user_id,
-            is_public=validated_data.get('is_public', False),
-            access_code=validated_data.get('access_code'),
-            use_supabase=use_supabase
-        )
+        # Salvar o arquivo localmente em blocos, calculando o tamanho e o SHA-256 na mesma passada
+        hasher = hashlib.sha256()
+        file_size = save_upload(file, file_path, hasher=hasher)
         
-        db.session.add(document)
-        db.session.flush()  # Obter ID sem commit
+        # Tipo MIME informado no cabeçalho da parte (já interpretado) ou deduzido pela extensão
+        file_type = file.mimetype or mimetypes.guess_type(original_filename)[0] or 'application/octet-stream'
         
-        # Se for usar Supabase Storage, fazer upload do arquivo
-        supabase_success = False
-        if use_supabase:
-            bucket_name = data.get('bucket_name', 'documents')
-            supabase_success = document.upload_to_supabase(bucket_name)
-            
-            if not supabase_success:
-                current_app.logger.warning(f"Falha ao fazer upload para o Supabase. Usando armazenamento local para o documento {document.id}")
-                document.use_supabase = False
+        return _store_document(file_path, filename, original_filename, file_size, file_type,
+                               validated_data, use_supabase, data.get('bucket_name', 'documents'),
+                               hasher.hexdigest())
+    except Exception as e:
+        # Se ocorrer um erro, excluir o arquivo se ele foi criado
+        if 'file_path' in locals() and os.path.exists(file_path):
+            try:
+                os.remove(file_path)
+            except:
+                pass
         
-        db.session.commit()
+        db.session.rollback()
+        current_app.logger.error(f"Erro ao enviar documento: {str(e)}")
+        return jsonify({'error': 'Erro ao enviar documento', 'details': str(e)}), 500
+
+@documents_bp.route('/stream', methods=['POST'])
+@jwt_required()
+def upload_document_stream():
+    """Faz upload de um documento enviado como corpo bruto da requisição (sem multipart)"""
+    # O nome do arquivo vem do cabeçalho X-Filename (ou ?filename=) e os metadados da query string;
+    # o corpo é gravado direto em disco, em blocos, sem passar pelo parser de formulários.
+    try:
+        raw_filename = request.headers.get('X-Filename') or request.args.get('filename')
+        if not raw_filename:
+            return jsonify({'message': 'Nome do arquivo não informado (cabeçalho X-Filename ou parâmetro filename)'}), 400
         
-        response_data = {
-            'message': 'Documento enviado com sucesso',
-            'document': document.to_dict(include_content=False)
-        }
+        data = request.args.to_dict()
+        data.pop('filename', None)
+        use_supabase = data.pop('use_supabase', 'false').lower() == 'true'
+        bucket_name = data.pop('bucket_name', 'documents')
         
-        if use_supabase:
-            if supabase_success:
-                response_data['storage'] = 'supabase'
-                response_data['public_url'] = document.get_supabase_url()
-            else:
-                response_data['storage'] = 'local'
-                response_data['warning'] = 'Falha ao fazer upload para o Supabase. Usando armazenamento local.'                
+        # Validar dados com o schema
+        validated_data = document_schema.load(data, partial=True)
+    except ValidationError as err:
+        return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
+    
+    file_path = None
+    try:
+        original_filename = secure_filename(raw_filename)
+        if not original_filename:
+            return jsonify({'message': 'Arquivo inválido'}), 400
+        filename = _unique_filename(original_filename)
+        file_path = os.path.join(get_upload_dir('documents'), filename)
+        
+        # Gravar o corpo da requisição em disco (o tamanho vem da contagem de bytes gravados
+        # e o SHA-256 é calculado na mesma passada)
+        hasher = hashlib.sha256()
+        file_size = save_stream(request.stream, file_path, hasher=hasher)
+        if not file_size:
+            os.remove(file_path)
+            return jsonify({'message': 'Arquivo inválido'}), 400
         
-        return jsonify(response_data), 201
+        # Tipo MIME informado no Content-Type ou deduzido pela extensão
+        file_type = request.mimetype or mimetypes.guess_type(original_filename)[0] or 'application/octet-stream'
+        
+        return _store_document(file_path, filename, original_filename, file_size, file_type,
+                               validated_data, use_supabase, bucket_name, hasher.hexdigest())
     except Exception as e:
         # Se ocorrer um erro, excluir o arquivo se ele foi criado
-        if 'file_path' in locals() and os.path.exists(file_path):
+        if file_path and os.path.exists(file_path):
             try:
                 os.remove(file_path)
-            except:
+            except OSError:
                 pass
         
         db.session.rollback()
+        # Corpo acima de MAX_CONTENT_LENGTH: mantém a resposta 413 do Werkzeug
+        if isinstance(e, RequestEntityTooLarge):
+            raise
         current_app.logger.error(f"Erro ao enviar documento: {str(e)}")
         return jsonify({'error': 'Erro ao enviar documento', 'details': str(e)}), 500
 
@@ -200,13 +430,13 @@ def upload_document():
 def get_document(document_id):
     """Obtém os detalhes de um documento específico"""
     try:
-        document = Document.query.get(document_id)
+        document = _load_document(document_id)
         if not document:
             return jsonify({'message': 'Documento não encontrado'}), 404
             
         # Verificar permissões para documentos não públicos
         if not document.is_public:
-            current_user_id = get_jwt_identity()
+            current_user_id, _ = get_caller()
             
             # Se não está autenticado e o documento não é público
             if not current_user_id:
@@ -234,13 +464,13 @@ def get_document(document_id):
 def download_document(document_id):
     """Baixa um documento"""
     try:
-        document = Document.query.get(document_id)
+        document = _load_document(document_id)
         if not document:
             return jsonify({'message': 'Documento não encontrado'}), 404
         
         # Verificar permissões para documentos não públicos
         if not document.is_public:
-            current_user_id = get_jwt_identity()
+            current_user_id, _ = get_caller()
             
             # Se não está autenticado e o documento não é público
             if not current_user_id:
@@ -249,53 +479,55 @@ def download_document(document_id):
                 if not access_code or access_code != document.access_code:
                     return jsonify({'message': 'Acesso negado. Este documento não é público.'}), 403
         
-        # Se estiver usando Supabase e quiser redirecionar para URL pública
-        redirect_to_supabase = request.args.get('redirect', 'false').lower() == 'true'
-        if document.use_supabase and redirect_to_supabase:
-            public_url = document.get_supabase_url()
-            if public_url:
-                return redirect(public_url)
-        
-        # Obter o conteúdo do arquivo
-        content = document.get_content()
-        if not content:
-            # Se não foi possível obter o conteúdo, verificar se o arquivo existe localmente
-            if not os.path.exists(document.file_path):
-                return jsonify({'message': 'Arquivo não encontrado no servidor'}), 404
-            else:
-                # Se existe localmente, tentar enviar diretamente
-                return send_file(
-                    document.file_path,
-                    mimetype=document.file_type,
-                    as_attachment=True,
-                    download_name=document.original_filename
-                )
-        
-        # Criar um arquivo temporário para servir o conteúdo
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False) as temp:
-            temp.write(content)
-            temp_filename = temp.name
-        
-        # Enviar o arquivo temporário
+        # Arquivos no Supabase: redirecionar para uma URL assinada temporária, para que o
+        # cliente baixe direto do Storage (sem passar pelo servidor da aplicação).
+        # Com ?proxy=true, o conteúdo continua sendo enviado pela aplicação.
+        proxy = request.args.get('proxy', 'false').lower() == 'true'
+        if document.use_supabase and not proxy:
+            signed_url = document.get_signed_url(SIGNED_URL_EXPIRES_IN)
+            if signed_url:
+                return redirect(signed_url, code=302)
+        
+        # Enviar o arquivo local (em blocos, com suporte a Range/ETag) ou o conteúdo do Supabase
+        source = document.download_source()
+        if source is None:
+            return jsonify({'message': 'Arquivo não encontrado no servidor'}), 404
+        
         return send_file(
-            temp_filename,
+            source,
             mimetype=document.file_type,
             as_attachment=True,
-            download_name=document.original_filename
+            download_name=document.original_filename,
+            conditional=True,
+            # ETag pelo hash do conteúdo; documentos antigos (sem hash) usam o ETag padrão do Werkzeug.
+            # Last-Modified também vale para o conteúdo vindo do Supabase (sem data de arquivo local).
+            etag=document.content_sha256 or True,
+            last_modified=document.updated_at
         )
     except Exception as e:
         current_app.logger.error(f"Erro ao baixar documento {document_id}: {str(e)}")
         return jsonify({'error': 'Erro ao baixar documento', 'details': str(e)}), 500
 
+def _migrate_one(supabase_manager, file_path, storage_path, bucket_name):
+    # Envia um arquivo local ao Supabase (executado nas threads da migração, sem acesso ao banco).
+    # Retorna None em caso de sucesso ou a mensagem de erro.
+    if not os.path.exists(file_path):
+        return 'Arquivo local não encontrado'
+    try:
+        if supabase_manager.upload_file_multipart(file_path, storage_path, bucket_name):
+            return None
+    except Exception:
+        pass
+    return 'Falha ao fazer upload para o Supabase'
+
+
 @documents_bp.route('/migrate-to-supabase', methods=['POST'])
 @jwt_required()
 def migrate_documents_to_supabase():
     """Migra documentos existentes do armazenamento local para o Supabase"""
     try:
         # Verificar permissões (apenas admin)
-        jwt_data = get_jwt()
-        user_role = jwt_data.get('role', '')
+        _, user_role = get_caller()
         if user_role != 'admin':
             return jsonify({'message': 'Permissão negada. Apenas administradores podem executar essa operação.'}), 403
         
@@ -331,7 +563,9 @@ def migrate_documents_to_supabase():
             'details': []
         }
         
-        # Migrar cada documento
+        # Documentos a enviar: os dados necessários são lidos aqui, pois a sessão do
+        # SQLAlchemy não pode ser compartilhada com as threads de upload
+        pending = []
         for document in documents:
             # Pular documentos que já usam Supabase
             if document.use_supabase:
@@ -341,46 +575,55 @@ def migrate_documents_to_supabase():
                     'message': 'Documento já está no Supabase'
                 })
                 continue
-                
-            # Verificar se o arquivo existe localmente
-            if not os.path.exists(document.file_path):
+            pending.append((document.id, document.file_path, document.new_storage_path()))
+        
+        # Enviar os arquivos em paralelo (uploads limitados pela rede, não pela CPU)
+        supabase_manager = SupabaseManager()  # Inicializa o cliente antes de criar as threads
+        workers = max(1, min(int(data.get('workers', MIGRATION_WORKERS)), MAX_MIGRATION_WORKERS))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_migrate_one, supabase_manager, file_path, storage_path, bucket_name)
+                       for _, file_path, storage_path in pending]
+            outcomes = [future.result() for future in futures]
+        
+        # Registrar os resultados no banco (na thread da requisição) com um único UPDATE
+        # em lote (executemany por chave primária) e confirmar de uma vez
+        migrated_files = []
+        migrated_rows = []
+        for (document_id, file_path, storage_path), error in zip(pending, outcomes):
+            if error:
                 results['failed'] += 1
                 results['details'].append({
-                    'id': document.id,
+                    'id': document_id,
                     'status': 'failed',
-                    'message': 'Arquivo local não encontrado'
+                    'message': error
                 })
                 continue
-                
-            # Tentar fazer upload para o Supabase
-            success = document.upload_to_supabase(bucket_name)
             
-            if success:
-                results['migrated'] += 1
-                results['details'].append({
-                    'id': document.id,
-                    'status': 'success',
-                    'message': 'Migrado com sucesso',
-                    'storage_path': document.storage_path,
-                    'public_url': document.get_supabase_url()
-                })
-                
-                # Se solicitado, excluir o arquivo local após migração bem-sucedida
-                if delete_local and os.path.exists(document.file_path):
-                    try:
-                        os.remove(document.file_path)
-                    except Exception as e:
-                        current_app.logger.warning(f"Erro ao excluir arquivo local {document.file_path}: {str(e)}")
-            else:
-                results['failed'] += 1
-                results['details'].append({
-                    'id': document.id,
-                    'status': 'failed',
-                    'message': 'Falha ao fazer upload para o Supabase'
-                })
+            migrated_rows.append({
+                'id': document_id,
+                'use_supabase': True,
+                'storage_bucket': bucket_name,
+                'storage_path': storage_path
+            })
+            migrated_files.append(file_path)
+            results['migrated'] += 1
+            results['details'].append({
+                'id': document_id,
+                'status': 'success',
+                'message': 'Migrado com sucesso',
+                'storage_path': storage_path,
+                'public_url': supabase_manager.get_public_url(storage_path, bucket_name)
+            })
         
         # Salvar as alterações no banco de dados
+        if migrated_rows:
+            db.session.execute(update(Document), migrated_rows)
         db.session.commit()
+        documents_cache.invalidate()
+        
+        # Se solicitado, excluir os arquivos locais (em segundo plano) após a migração ser confirmada
+        if delete_local:
+            delete_files_later(migrated_files)
         
         return jsonify({
             'message': f'Migração concluída. {results["migrated"]} documentos migrados, {results["failed"]} falhas.',
@@ -394,27 +637,24 @@ def migrate_documents_to_supabase():
 def update_document(document_id):
     """Atualiza os metadados de um documento"""
     try:
-        document = Document.query.get(document_id)
+        document = _load_document(document_id)
         if not document:
             return jsonify({'message': 'Documento não encontrado'}), 404
             
         data = request.json or {}
         
-        # Configurar contexto para validação
-        document_schema.context = {
-            'entity_type': data.get('entity_type', document.entity_type)
-        }
-        
         # Validar dados parcialmente
         validated_data = document_schema.load(data, partial=True)
+        
+        # Sem entity_type na requisição, entity_id é validado contra o tipo já salvo
+        if 'entity_id' in validated_data and 'entity_type' not in validated_data:
+            validate_entity_id(document.entity_type, validated_data['entity_id'])
     except ValidationError as err:
         return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
 
     try:
         # Verificar permissões
-        jwt_data = get_jwt()
-        user_role = jwt_data.get('role', '')
-        current_user_id = get_jwt_identity()
+        current_user_id, user_role = get_caller()
         
         # Permitir edição apenas para admins ou o usuário que fez upload
         if user_role != 'admin' and str(document.uploaded_by) != current_user_id:
@@ -435,6 +675,7 @@ def update_document(document_id):
             document.access_code = validated_data['access_code']
         
         db.session.commit()
+        documents_cache.invalidate()
         
         return jsonify({
             'message': 'Documento atualizado com sucesso',
@@ -450,14 +691,12 @@ def update_document(document_id):
 def delete_document(document_id):
     """Remove um documento"""
     try:
-        document = Document.query.get(document_id)
+        document = _load_document(document_id)
         if not document:
             return jsonify({'message': 'Documento não encontrado'}), 404
             
         # Verificar permissões
-        jwt_data = get_jwt()
-        user_role = jwt_data.get('role', '')
-        current_user_id = get_jwt_identity()
+        current_user_id, user_role = get_caller()
         
         # Permitir exclusão apenas para admins ou o usuário que fez upload
         if user_role != 'admin' and str(document.uploaded_by) != current_user_id:
@@ -469,13 +708,10 @@ def delete_document(document_id):
         # Excluir o documento do banco de dados
         db.session.delete(document)
         db.session.commit()
+        documents_cache.invalidate()
         
-        # Excluir o arquivo físico
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except Exception as file_err:
-                current_app.logger.warning(f"Erro ao excluir arquivo {file_path}: {str(file_err)}")
+        # Excluir o arquivo físico em segundo plano
+        delete_files_later([file_path])
         
         return jsonify({'message': 'Documento removido com sucesso'}), 200
     except Exception as e:
@@ -488,14 +724,12 @@ def delete_document(document_id):
 def share_document(document_id):
     """Gera um código de acesso para compartilhar um documento"""
     try:
-        document = Document.query.get(document_id)
+        document = _load_document(document_id)
         if not document:
             return jsonify({'message': 'Documento não encontrado'}), 404
             
         # Verificar permissões
-        jwt_data = get_jwt()
-        user_role = jwt_data.get('role', '')
-        current_user_id = get_jwt_identity()
+        current_user_id, user_role = get_caller()
         
         # Permitir compartilhamento apenas para admins ou o usuário que fez upload
         if user_role != 'admin' and str(document.uploaded_by) != current_user_id:
@@ -515,6 +749,7 @@ def share_document(document_id):
         # Atualizar visibilidade
         document.is_public = is_public
         db.session.commit()
+        documents_cache.invalidate()
         
         # Construir URL de compartilhamento
         base_url = current_app.config.get('BASE_URL', request.host_url.rstrip('/'))
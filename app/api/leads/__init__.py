@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-bp = Blueprint('leads', __name__, url_prefix='/leads')
+bp = Blueprint('leads', __name__)
 
 from app.api.leads import routes 
\ No newline at end of file
@@ -4,17 +4,79 @@ Endpoints da API para gerenciamento de leads no sistema CRM.
 Este módulo implementa operações CRUD para leads, incluindo listagem paginada,
 criação, edição, exclusão e endpoints para obter opções de status e origem.
 """
-from flask import jsonify, request, current_app
+import hashlib
+
+from flask import Response, jsonify, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from marshmallow import ValidationError
+from sqlalchemy.orm import joinedload
 
 from app import db
+from app.api._errors import INVALID_CURSOR, bad_request
+from app.api.deals import cache as deals_cache
 from app.api.leads import bp
 from app.models import Lead, User
+from app.utils.pagination import cursor_from_args, keyset_page
+from app.utils.queries import search_pattern
+from app.utils.serialization import dumps, get_json_body, ojsonify
+from app.utils.validation import FastLoader
 from .schemas import LeadSchema
 
 lead_schema = LeadSchema()
 lead_update_schema = LeadSchema(partial=True)
+lead_loader = FastLoader(lead_schema)
+lead_update_loader = FastLoader(lead_update_schema)
+
+# Colunas da listagem de leads, na ordem dos campos de cada item da resposta
+_LEAD_LIST_COLUMNS = (
+    Lead.id, Lead.nome, Lead.email, Lead.telefone, Lead.empresa, Lead.cargo,
+    Lead.status, Lead.origem, Lead.criado_em,
+)
+
+# Opções de carregamento de um lead: o usuário responsável (usado por to_dict) vem no mesmo SELECT
+LEAD_LOAD_OPTIONS = (joinedload(Lead.usuario),)
+
+
+def _load_lead(lead_id):
+    # Carrega um lead pelo ID (ou None) com LEAD_LOAD_OPTIONS.
+    return db.session.get(Lead, lead_id, options=LEAD_LOAD_OPTIONS)
+
+
+# Filtros da listagem: parâmetro da query string -> coluna
+_LIKE_FILTERS = (('nome', Lead.nome), ('email', Lead.email), ('empresa', Lead.empresa))  # pesquisa parcial (ILIKE)
+_EQ_FILTERS = (('status', Lead.status), ('origem', Lead.origem))  # correspondência exata
+
+# Corpos JSON das opções de status e origem, serializados uma única vez na importação.
+# A cada requisição é criada apenas a Response (hooks after_request podem alterar os cabeçalhos).
+# As listas só mudam com um novo deploy: as respostas levam ETag e podem ficar em cache por um dia.
+_OPTIONS_MAX_AGE = 86400  # segundos
+_STATUS_OPTIONS_BODY = dumps([
+    {'value': 'novo', 'label': 'Novo'},
+    {'value': 'contatado', 'label': 'Contatado'},
+    {'value': 'qualificado', 'label': 'Qualificado'},
+    {'value': 'negociacao', 'label': 'Em Negociação'},
+    {'value': 'ganho', 'label': 'Ganho'},
+    {'value': 'perdido', 'label': 'Perdido'}
+])
+_ORIGEM_OPTIONS_BODY = dumps([
+    {'value': 'site', 'label': 'Site'},
+    {'value': 'indicacao', 'label': 'Indicação'},
+    {'value': 'email_marketing', 'label': 'Email Marketing'},
+    {'value': 'redes_sociais', 'label': 'Redes Sociais'},
+    {'value': 'evento', 'label': 'Evento'},
+    {'value': 'outros', 'label': 'Outros'}
+])
+_STATUS_OPTIONS_ETAG = hashlib.sha1(_STATUS_OPTIONS_BODY).hexdigest()
+_ORIGEM_OPTIONS_ETAG = hashlib.sha1(_ORIGEM_OPTIONS_BODY).hexdigest()
+
+
+def _options_response(body, etag):
+    # Resposta de uma lista de opções estática, com ETag e Cache-Control (304 se o ETag coincidir).
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = _OPTIONS_MAX_AGE
+    return response.make_conditional(request)
 
 
 @bp.route('/', methods=['GET'])
@@ -23,8 +85,14 @@ def get_leads():
     """
     Obtém uma lista paginada de leads com suporte a filtros.
     
+    Por padrão a paginação é por cursor (keyset) sobre (criado_em DESC, id DESC), sem
+    COUNT(*) nem OFFSET; se 'page' for informado, usa a paginação por página com totais.
+    
     Query parameters:
-        page (int): Número da página (padrão: 1)
+        cursor (str): next_cursor da resposta anterior
+        after_criado_em (str), after_id (int): Alternativa ao cursor (último item da página anterior)
+        with_total (str): '1' para incluir o total de itens na paginação por cursor
+        page (int): Número da página (paginação por página)
         per_page (int): Itens por página (padrão: 10, máximo: 100)
         nome (str): Filtra por nome (pesquisa parcial)
         email (str): Filtra por email (pesquisa parcial)
@@ -36,92 +104,63 @@ def get_leads():
         JSON com leads paginados e metadados da paginação
     """
     try:
-        # Obter identificação do usuário a partir do token JWT
-        current_user_id = get_jwt_identity()
-        current_app.logger.info(f"Token validado com sucesso. ID do usuário: {current_user_id}")
-        
-        # Configurar parâmetros de paginação com validação
+        # Configurar parâmetros de paginação (type=int devolve o padrão para valores inválidos)
+        args = request.args
+        page = args.get('page', type=int)
+        if page is not None:
+            page = max(page, 1)
+        # Limita os itens por página entre 1 e 100 para prevenir sobrecarga
+        per_page = min(max(args.get('per_page', 10, type=int), 1), 100)
         try:
-            page = request.args.get('page', 1, type=int)
-            # Limita o número máximo de itens por página para prevenir sobrecarga
-            per_page = min(request.args.get('per_page', 10, type=int), 100)
-            current_app.logger.info(f"Parâmetros de paginação: page={page}, per_page={per_page}")
-        except Exception as e:
-            current_app.logger.error(f"Erro ao processar parâmetros de paginação: {str(e)}")
-            # Valores padrão caso ocorra erro na validação
-            page = 1
-            per_page = 10
-        
-        # Iniciar consulta base
-        query = Lead.query
+            cursor_key = cursor_from_args(args, 'after_criado_em')
+        except ValueError:
+            return bad_request(INVALID_CURSOR)
         
-        # Aplicar filtros dinâmicos com base nos parâmetros da requisição
-        current_app.logger.info(f"Request args: {request.args}")
+        # Iniciar consulta base (apenas as colunas da listagem, sem objetos ORM)
+        query = db.session.query(*_LEAD_LIST_COLUMNS)
         
-        # Aplicar filtros de pesquisa parcial (usando LIKE)
-        for filter_name, model_field in [
-            ('nome', Lead.nome),
-            ('email', Lead.email),
-            ('empresa', Lead.empresa)
-        ]:
-            if request.args.get(filter_name):
-                filter_value = f"%{request.args.get(filter_name)}%"
-                query = query.filter(model_field.ilike(filter_value))
-                current_app.logger.info(f"Filtrando por {filter_name}: {filter_value}")
+        # Aplicar os filtros informados em uma única passada e um único filter()
+        conditions = []
+        for filter_name, model_field in _LIKE_FILTERS:
+            filter_value = args.get(filter_name)
+            if filter_value:
+                conditions.append(model_field.ilike(search_pattern(filter_value)))
+        for filter_name, model_field in _EQ_FILTERS:
+            filter_value = args.get(filter_name)
+            if filter_value:
+                conditions.append(model_field == filter_value)
+        if conditions:
+            query = query.filter(*conditions)
         
-        # Aplicar filtros de correspondência exata
-        for filter_name, model_field in [
-            ('status', Lead.status),
-            ('origem', Lead.origem)
-        ]:
-            if request.args.get(filter_name):
-                filter_value = request.args.get(filter_name)
-                query = query.filter(model_field == filter_value)
-                current_app.logger.info(f"Filtrando por {filter_name}: {filter_value}")
+        if page is None or cursor_key is not None:
+            # Paginação por cursor: busca por intervalo no índice (criado_em DESC, id DESC);
+            # uma linha extra indica se há próxima página. O total só é calculado se with_total=1.
+            total = query.count() if args.get('with_total') == '1' else None
+            leads, next_cursor = keyset_page(query, Lead.criado_em, Lead.id, per_page, cursor_key)
+            result = {
+                # Cada linha vira o dicionário da listagem (criado_em é serializado em ISO 8601 pelo orjson)
+                'items': [row._asdict() for row in leads],
+                'per_page': per_page,
+                'has_next': next_cursor is not None,
+                'next_cursor': next_cursor
+            }
+            if total is not None:
+                result['total'] = total
+            return ojsonify(result)
         
+        # Paginação por página (com totais), mantida para clientes existentes.
         # Ordenação padrão por data de criação (mais recentes primeiro)
-        query = query.order_by(Lead.criado_em.desc())
-        
-        # Contagem total para diagnóstico e informações de paginação
-        leads_count = query.count()
-        current_app.logger.info(f"Total de leads encontrados após aplicar filtros: {leads_count}")
-        
-        # Aplicar paginação à consulta
+        query = query.order_by(Lead.criado_em.desc(), Lead.id.desc())
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        leads = pagination.items
-        current_app.logger.info(f"Paginação bem-sucedida. {len(leads)} leads na página {page}")
-        
-        # Construir resposta com manipulação segura de cada lead
-        lead_list = []
-        for lead in leads:
-            try:
-                # Estrutura simplificada e otimizada para listagem
-                lead_dict = {
-                    'id': lead.id,
-                    'nome': lead.nome,
-                    'email': lead.email,
-                    'telefone': lead.telefone,
-                    'empresa': lead.empresa,
-                    'cargo': lead.cargo,
-                    'status': lead.status,
-                    'origem': lead.origem,
-                    'criado_em': lead.criado_em.isoformat() if lead.criado_em else None
-                }
-                lead_list.append(lead_dict)
-            except Exception as e:
-                current_app.logger.error(f"Erro ao processar lead {lead.id}: {str(e)}")
         
         # Estrutura de resposta com metadados de paginação
-        result = {
-            'items': lead_list,
+        return ojsonify({
+            'items': [row._asdict() for row in pagination.items],
             'total': pagination.total,
             'pages': pagination.pages,
             'page': page,
             'per_page': per_page
-        }
-        
-        current_app.logger.info("Resposta preparada com sucesso")
-        return jsonify(result)
+        })
             
     except Exception as e:
         current_app.logger.error(f"Erro global ao listar leads: {str(e)}")
@@ -144,8 +183,8 @@ def get_lead(id):
         JSON com os dados do lead ou mensagem de erro
     """
     try:
-        # Busca o lead pelo ID
-        lead = Lead.query.get(id)
+        # Busca o lead pelo ID (com o usuário responsável)
+        lead = _load_lead(id)
         if not lead:
             return jsonify({'error': 'Lead não encontrado'}), 404
             
@@ -162,7 +201,7 @@ def create_lead():
     """Cria um novo lead com validação de schema."""
     try:
         # Valida os dados usando o schema
-        data = lead_schema.load(request.json or {})
+        data = lead_loader.load(get_json_body())
     except ValidationError as err:
         return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
 
@@ -188,13 +227,13 @@ def create_lead():
 @jwt_required()
 def update_lead(id):
     """Atualiza um lead existente com validação de schema."""
-    lead = Lead.query.get(id)
+    lead = _load_lead(id)
     if not lead:
         return jsonify({'error': 'Lead não encontrado'}), 404
             
     try:
         # Valida os dados usando o schema de atualização (partial=True)
-        data = lead_update_schema.load(request.json or {})
+        data = lead_update_loader.load(get_json_body())
     except ValidationError as err:
         return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
 
@@ -204,6 +243,7 @@ def update_lead(id):
             setattr(lead, field, value)
         
         db.session.commit()
+        deals_cache.invalidate()  # Os negócios em cache incluem nome/email do lead
         return jsonify(lead.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -232,6 +272,7 @@ def delete_lead(id):
         # Excluir lead
         db.session.delete(lead)
         db.session.commit()
+        deals_cache.invalidate()
         
         return jsonify({'message': 'Lead excluído com sucesso'})
     except Exception as e:
@@ -250,16 +291,7 @@ def get_lead_status_options():
     Returns:
         JSON com lista de opções de status (value/label)
     """
-    status_options = [
-        {'value': 'novo', 'label': 'Novo'},
-        {'value': 'contatado', 'label': 'Contatado'},
-        {'value': 'qualificado', 'label': 'Qualificado'},
-        {'value': 'negociacao', 'label': 'Em Negociação'},
-        {'value': 'ganho', 'label': 'Ganho'},
-        {'value': 'perdido', 'label': 'Perdido'}
-    ]
-    
-    return jsonify(status_options)
+    return _options_response(_STATUS_OPTIONS_BODY, _STATUS_OPTIONS_ETAG)
 
 
 @bp.route('/origem', methods=['GET'])
@@ -271,13 +303,4 @@ def get_lead_origem_options():
     Returns:
         JSON com lista de opções de origem (value/label)
     """
-    origem_options = [
-        {'value': 'site', 'label': 'Site'},
-        {'value': 'indicacao', 'label': 'Indicação'},
-        {'value': 'email_marketing', 'label': 'Email Marketing'},
-        {'value': 'redes_sociais', 'label': 'Redes Sociais'},
-        {'value': 'evento', 'label': 'Evento'},
-        {'value': 'outros', 'label': 'Outros'}
-    ]
-    
-    return jsonify(origem_options)
+    return _options_response(_ORIGEM_OPTIONS_BODY, _ORIGEM_OPTIONS_ETAG)
@@ -0,0 +1,31 @@
+"""
+Cache em memória (por processo, com TTL curto) das respostas JSON de pipelines.
+
+Os pipelines mudam raramente e são consultados a cada carregamento do quadro de
+negócios; o cache guarda os corpos já serializados de GET /pipeline e
+GET /pipeline/default e é invalidado nas rotas de escrita.
+Em outros processos, alterações ficam visíveis após no máximo CACHE_TTL segundos.
+"""
+
+from app.utils.cache import TTLCache
+
+CACHE_TTL = 60  # segundos
+
+_cache = TTLCache(CACHE_TTL)  # chave ('all' ou 'default') -> corpo JSON em bytes ou None
+
+
+def get_body(key, build):
+    # Retorna o corpo JSON em cache para a chave, gerando-o com build() se ausente/expirado.
+    #
+    # Args:
+    #     key (str): Chave da resposta ('all' ou 'default').
+    #     build (callable): Função sem argumentos que consulta o banco e retorna os bytes
+    #         (ou None quando não há o que retornar, o que também fica em cache).
+    #
+    # Returns:
+    #     bytes | None: Corpo JSON serializado.
+    return _cache.get_or_set(key, build)
+
+
+# Descarta o cache após criar ou alterar um pipeline.
+invalidate = _cache.clear
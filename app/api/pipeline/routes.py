@@ -1,10 +1,13 @@
-from flask import jsonify, request, current_app
+from flask import Response, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from marshmallow import ValidationError
 
 from app import db
 from app.api.pipeline import bp
+from app.api.pipeline import cache as pipelines_cache
 from app.models.pipeline import Pipeline, PipelineStage
+from app.utils.queries import record_exists
+from app.utils.serialization import dumps, get_json_body, ojsonify
 from .schemas import PipelineStageSchema
 
 # --- INÍCIO: Adicionar schemas para Pipeline ---
@@ -18,30 +21,48 @@ class PipelineSchema(Schema):
     criado_em = fields.DateTime(dump_only=True)
     atualizado_em = fields.DateTime(dump_only=True)
 
-pipeline_schema = PipelineSchema()
-pipelines_schema = PipelineSchema(many=True)
+pipeline_schema = PipelineSchema()  # Apenas validação de entrada (load)
 # --- FIM: Adicionar schemas para Pipeline ---
 
 pipeline_stage_schema = PipelineStageSchema()
 pipeline_stage_update_schema = PipelineStageSchema(partial=True)
 
+# Colunas da listagem de pipelines, na ordem dos campos de cada item da resposta
+_PIPELINE_LIST_COLUMNS = (
+    Pipeline.id, Pipeline.name, Pipeline.description, Pipeline.is_default,
+    Pipeline.criado_em, Pipeline.atualizado_em,
+)
+
+# Colunas dos estágios, na ordem dos campos de PipelineStage.to_dict()
+_STAGE_COLUMNS = (
+    PipelineStage.id, PipelineStage.name, PipelineStage.description, PipelineStage.order,
+    PipelineStage.color, PipelineStage.pipeline_id, PipelineStage.is_system,
+    PipelineStage.criado_em, PipelineStage.atualizado_em,
+)
+
 # --- INÍCIO: Novas Rotas para Pipelines --- 
 @bp.route('/', methods=['GET'])
 @jwt_required()
 def get_pipelines():
     """Get all pipelines."""
     try:
-        pipelines = Pipeline.query.order_by(Pipeline.name).all()
-        return jsonify(pipelines_schema.dump(pipelines)), 200
+        body = pipelines_cache.get_body('all', _build_pipelines_body)
+        return Response(body, status=200, mimetype='application/json')
     except Exception as e:
         current_app.logger.error(f"Error fetching pipelines: {str(e)}")
         return jsonify({'error': 'Error fetching pipelines', 'details': str(e)}), 500
 
+def _build_pipelines_body():
+    # Consulta e serializa a lista de pipelines (ordenada por nome) para o cache.
+    # Apenas as colunas da listagem, sem objetos ORM nem marshmallow (datas em ISO 8601 pelo orjson).
+    rows = db.session.query(*_PIPELINE_LIST_COLUMNS).order_by(Pipeline.name).all()
+    return dumps([row._asdict() for row in rows])
+
 @bp.route('/', methods=['POST'])
 @jwt_required()
 def create_pipeline():
     """Create a new pipeline with default stages."""
-    json_data = request.get_json()
+    json_data = get_json_body()
     if not json_data:
         return jsonify({"message": "No input data provided"}), 400
 
@@ -65,9 +86,10 @@ def create_pipeline():
         PipelineStage.create_default_stages(new_pipeline.id)
         
         db.session.commit() # Commita o pipeline e os estágios
+        pipelines_cache.invalidate()
         
         # Retorna o pipeline criado (sem os estágios por padrão)
-        return jsonify(pipeline_schema.dump(new_pipeline)), 201
+        return ojsonify(new_pipeline.to_dict(), 201)
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro ao criar pipeline: {str(e)}")
@@ -79,20 +101,23 @@ def create_pipeline():
 def get_pipeline_stages(id):
     """Get all stages for a specific pipeline."""
     try:
-        # Verify if pipeline exists
-        pipeline = Pipeline.query.get(id)
-        if not pipeline:
+        # Get all stages for this pipeline ordered by order (a single query, plain rows);
+        # the pipeline's existence is only checked when it has no stages
+        rows = (db.session.query(*_STAGE_COLUMNS)
+                .filter(PipelineStage.pipeline_id == id)
+                .order_by(PipelineStage.order)
+                .all())
+        if not rows and not record_exists(Pipeline, id=id):
             return jsonify({'error': 'Pipeline not found'}), 404
-            
-        # Get all stages for this pipeline ordered by order
-        stages = PipelineStage.query.filter_by(pipeline_id=id).order_by(PipelineStage.order).all()
         
-        # Convert to dict
+        # Same fields as PipelineStage.to_dict(), built in one pass (dates in ISO 8601 via orjson)
         result = []
-        for stage in stages:
-            result.append(stage.to_dict())
+        for row in rows:
+            stage = row._asdict()
+            stage['description'] = stage['description'] or ''
+            result.append(stage)
             
-        return jsonify(result)
+        return ojsonify(result)
     except Exception as e:
         current_app.logger.error(f"Error fetching pipeline stages: {str(e)}")
         return jsonify({'error': 'Error fetching pipeline stages', 'details': str(e)}), 500
@@ -102,16 +127,21 @@ def get_pipeline_stages(id):
 def get_default_pipeline():
     """Get the default pipeline."""
     try:
-        # Get the default pipeline
-        pipeline = Pipeline.query.filter_by(is_default=True).first()
-        if not pipeline:
+        # Get the default pipeline (serialized body cached; None means there is none)
+        body = pipelines_cache.get_body('default', _build_default_pipeline_body)
+        if body is None:
             return jsonify({'error': 'No default pipeline found'}), 404
             
-        return jsonify(pipeline.to_dict())
+        return Response(body, mimetype='application/json')
     except Exception as e:
         current_app.logger.error(f"Error fetching default pipeline: {str(e)}")
         return jsonify({'error': 'Error fetching default pipeline', 'details': str(e)}), 500
 
+def _build_default_pipeline_body():
+    # Consulta e serializa o pipeline padrão para o cache (None se não houver).
+    pipeline = Pipeline.query.filter_by(is_default=True).first()
+    return None if pipeline is None else dumps(pipeline.to_dict())
+
 # --- COMENTAR ROTAS DE STAGES POR ENQUANTO ---
 # @bp.route('/stages', methods=['GET'])
 # @jwt_required()
@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-tasks_bp = Blueprint('tasks', __name__, url_prefix='/tasks')
+tasks_bp = Blueprint('tasks', __name__)
 
 from . import routes
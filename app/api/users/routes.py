@@ -4,6 +4,8 @@ from marshmallow import ValidationError
 
 from . import bp  # Import the Blueprint defined in __init__.py
 from app import db
+from app.api.deals import cache as deals_cache
+from app.api.documents import cache as documents_cache
 from app.models.user import User
 # Importa os schemas específicos de users
 from .schemas import UserUpdateSchema, PasswordUpdateSchema, AdminUserCreateSchema
@@ -12,6 +14,14 @@ user_update_schema = UserUpdateSchema()
 password_update_schema = PasswordUpdateSchema()
 admin_user_create_schema = AdminUserCreateSchema()
 
+
+def _invalidate_user_caches():
+    # Descarta os caches de respostas que incluem dados de usuários (negócios: usuário
+    # responsável; documentos: nome de quem fez o upload) após alterar ou excluir um usuário.
+    deals_cache.invalidate()
+    documents_cache.invalidate()
+
+
 @bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
@@ -58,6 +68,7 @@ def update_current_user():
             setattr(user, field, value)
                 
         db.session.commit()
+        _invalidate_user_caches()
         return jsonify(user.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -162,6 +173,7 @@ def update_user(id):
             setattr(user_to_update, field, value)
                 
         db.session.commit()
+        _invalidate_user_caches()
         return jsonify(user_to_update.to_dict())
     except Exception as e:
         db.session.rollback()
@@ -274,6 +286,7 @@ def delete_user(id):
             
         db.session.delete(user)
         db.session.commit()
+        _invalidate_user_caches()
         
         return jsonify({'message': 'Usuário excluído com sucesso'})
     except Exception as e:
@@ -1,5 +1,5 @@
 from flask import Blueprint
 
-workflows_bp = Blueprint('workflows', __name__, url_prefix='/workflows')
+workflows_bp = Blueprint('workflows', __name__)
 
 from . import routes
@@ -2,7 +2,14 @@ from app.models.user import User
 from app.models.customer import Customer
 from app.models.custom_field import CustomField, CustomFieldValue
 from app.models.lead import Lead
+from app.models.pipeline import Pipeline, PipelineStage
+from app.models.deal import Deal
 from app.models.task import Task
 from app.models.communication import Communication
 from app.models.workflow import Workflow, WorkflowAction
 from app.models.document import Document
+
+__all__ = [
+    'User', 'Customer', 'CustomField', 'CustomFieldValue', 'Lead', 'Pipeline', 'PipelineStage',
+    'Deal', 'Task', 'Communication', 'Workflow', 'WorkflowAction', 'Document',
+]
@@ -41,6 +41,13 @@ class Communication(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Índices compostos para a paginação por cursor (date_time DESC, id DESC) da listagem,
+    # inclusive quando filtrada pela entidade associada.
+    __table_args__ = (
+        db.Index('ix_communications_date_time_id', date_time.desc(), id.desc()),
+        db.Index('ix_communications_entity_date_time_id', entity_type, entity_id, date_time.desc(), id.desc()),
+    )
+    
     def __init__(self, comm_type, subject=None, content=None, outcome=None, date_time=None,
                  duration_minutes=None, entity_type=None, entity_id=None, user_id=None):
         # Construtor da classe Communication.
@@ -54,8 +61,25 @@ class Communication(db.Model):
         self.entity_id = entity_id
         self.user_id = user_id
     
-    def to_dict(self, include_attachments=True):
+    def to_dict(self, include_attachments=True, mode='full'):
         # Retorna uma representação em dicionário do objeto Communication.
+        # Com mode='list' (usado na listagem), retorna apenas os campos de cabeçalho: sem o conteúdo,
+        # timestamps e anexos serializados, apenas a quantidade de anexos.
+        if mode == 'list':
+            return {
+                'id': self.id,
+                'comm_type': self.comm_type,
+                'subject': self.subject,
+                'outcome': self.outcome,
+                'date_time': self.date_time.strftime('%Y-%m-%d %H:%M:%S') if self.date_time else None,
+                'duration_minutes': self.duration_minutes,
+                'entity_type': self.entity_type,
+                'entity_id': self.entity_id,
+                'user_id': self.user_id,
+                'user_name': self.user.name if self.user else None,
+                'attachment_count': len(self.attachments)
+            }
+        
         data = {
             'id': self.id,
             'comm_type': self.comm_type,
@@ -41,7 +41,16 @@ class Deal(db.Model):
     
     # Timestamps de criação e atualização automática
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
-    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    # Índices compostos da paginação por cursor da listagem (criado_em DESC, id DESC),
+    # sem filtro e com os filtros mais comuns (estágio, status e usuário responsável)
+    __table_args__ = (
+        db.Index('ix_deals_criado_em_id', criado_em.desc(), id.desc()),
+        db.Index('ix_deals_stage_criado_em_id', pipeline_stage_id, criado_em.desc(), id.desc()),
+        db.Index('ix_deals_status_criado_em_id', status, criado_em.desc(), id.desc()),
+        db.Index('ix_deals_usuario_criado_em_id', usuario_id, criado_em.desc(), id.desc()),
+    )
     
     def to_dict(self):
         # Converte o objeto Deal em um dicionário serializável para APIs JSON.
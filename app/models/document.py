@@ -3,8 +3,20 @@ import os
 from app import db
 from app.utils.supabase_client import SupabaseManager
 import base64
+import io
 import uuid
 
+# Extensões classificadas como imagem e como documento office/pdf
+IMAGE_EXTENSIONS = frozenset(('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'))
+DOCUMENT_EXTENSIONS = frozenset(('.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt'))
+
+
+def file_extension(filename):
+    """Retorna a extensão do nome de arquivo, em minúsculas ('' se não houver)"""
+    _, ext = os.path.splitext(filename)
+    return ext.lower() if ext else ''
+
+
 class Document(db.Model):
     """Modelo para documentos e arquivos anexados no CRM"""
     __tablename__ = 'documents'
@@ -15,6 +27,7 @@ class Document(db.Model):
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer)  # Tamanho em bytes
     file_type = db.Column(db.String(100))  # MIME type
+    content_sha256 = db.Column(db.String(64), index=True)  # Hash do conteúdo (ETag e deduplicação)
     
     # Metadados
     title = db.Column(db.String(255))
@@ -42,17 +55,24 @@ class Document(db.Model):
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    # Índices da paginação por cursor (created_at DESC, id DESC), geral e por entidade
+    __table_args__ = (
+        db.Index('ix_documents_created_at_id', created_at.desc(), id.desc()),
+        db.Index('ix_documents_entity_created_at_id', entity_type, entity_id, created_at.desc(), id.desc()),
+    )
     
     def __init__(self, filename, original_filename, file_path, file_size=None, file_type=None,
                  title=None, description=None, entity_type=None, entity_id=None,
                  communication_id=None, uploaded_by=None, is_public=False, access_code=None,
-                 use_supabase=False, storage_bucket=None, storage_path=None):
+                 use_supabase=False, storage_bucket=None, storage_path=None, content_sha256=None):
         self.filename = filename
         self.original_filename = original_filename
         self.file_path = file_path
         self.file_size = file_size
         self.file_type = file_type
+        self.content_sha256 = content_sha256
         self.title = title or original_filename
         self.description = description
         self.entity_type = entity_type
@@ -68,20 +88,22 @@ class Document(db.Model):
     @property
     def extension(self):
         """Retorna a extensão do arquivo"""
-        _, ext = os.path.splitext(self.original_filename)
-        return ext.lower() if ext else ''
+        return file_extension(self.original_filename)
     
     @property
     def is_image(self):
         """Verifica se o arquivo é uma imagem"""
-        image_types = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
-        return self.extension in image_types
+        return self.extension in IMAGE_EXTENSIONS
     
     @property
     def is_document(self):
         """Verifica se o arquivo é um documento office/pdf"""
-        doc_types = ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt']
-        return self.extension in doc_types
+        return self.extension in DOCUMENT_EXTENSIONS
+    
+    def new_storage_path(self):
+        """Gera um caminho único para o arquivo no Supabase Storage"""
+        uid = str(uuid.uuid4())
+        return f"{self.entity_type}/{self.entity_id or 'general'}/{uid}{self.extension}"
     
     def upload_to_supabase(self, bucket_name='documents'):
         """Faz upload do arquivo para o armazenamento do Supabase"""
@@ -90,14 +112,13 @@ class Document(db.Model):
             
         try:
             # Gerar um caminho único para o arquivo no Supabase
-            uid = str(uuid.uuid4())
-            storage_path = f"{self.entity_type}/{self.entity_id or 'general'}/{uid}{self.extension}"
+            storage_path = self.new_storage_path()
             
             # Obter o cliente Supabase
             supabase_manager = SupabaseManager()
             
-            # Fazer upload do arquivo
-            result = supabase_manager.upload_file(self.file_path, storage_path, bucket_name)
+            # Fazer upload do arquivo (em partes paralelas, se for grande e o S3 estiver configurado)
+            result = supabase_manager.upload_file_multipart(self.file_path, storage_path, bucket_name)
             
             if result:
                 # Atualizar os campos do documento
@@ -120,6 +141,17 @@ class Document(db.Model):
         except Exception:
             return None
     
+    def get_signed_url(self, expires_in=300):
+        """Obtém uma URL assinada (temporária) do arquivo no Supabase"""
+        if not self.use_supabase or not self.storage_bucket or not self.storage_path:
+            return None
+            
+        try:
+            supabase_manager = SupabaseManager()
+            return supabase_manager.create_signed_url(self.storage_path, self.storage_bucket, expires_in)
+        except Exception:
+            return None
+    
     def get_content(self):
         """Obtém o conteúdo do arquivo"""
         # Se o arquivo estiver no Supabase
@@ -142,6 +174,26 @@ class Document(db.Model):
                 
         return None
     
+    def download_source(self):
+        """
+        Retorna a origem do conteúdo para download, sem copiar o arquivo local:
+        o caminho do arquivo local (enviado em blocos pelo send_file) ou, se ele não
+        existir mais, um BytesIO com o conteúdo baixado do Supabase. None se indisponível.
+        """
+        if os.path.exists(self.file_path):
+            return self.file_path
+        
+        if self.use_supabase and self.storage_bucket and self.storage_path:
+            try:
+                supabase_manager = SupabaseManager()
+                content = supabase_manager.download_file(self.storage_path, self.storage_bucket)
+                if content:
+                    return io.BytesIO(content)
+            except Exception:
+                pass
+        
+        return None
+    
     def to_dict(self, include_content=False):
         """Retorna uma representação em dicionário do documento"""
         data = {
@@ -7,6 +7,7 @@ O modelo armazena informações de contato, origem, interesse, status e históri
 """
 from datetime import datetime
 from app import db
+from app.utils.queries import loaded_columns
 from flask import current_app
 
 
@@ -46,7 +47,7 @@ class Lead(db.Model):
     
     # Colunas de auditoria (timestamps automáticos)
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
-    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relacionamento com o usuário responsável
     usuario_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True) # Chave estrangeira para a tabela users (indexada)
@@ -54,6 +55,11 @@ class Lead(db.Model):
     # `backref='leads'` cria o atributo `user.leads` no modelo User
     usuario = db.relationship('User', backref='leads')
 
+    # Índice da paginação por cursor da listagem (criado_em DESC, id DESC)
+    __table_args__ = (
+        db.Index('ix_leads_criado_em_id', criado_em.desc(), id.desc()),
+    )
+
     def to_dict(self):
         # Converte o objeto Lead em um dicionário serializável para APIs JSON.
         # Inclui informações do usuário responsável, se disponível.
@@ -77,23 +83,26 @@ class Lead(db.Model):
                     # Cria um dicionário básico com o ID do usuário como fallback.
                     usuario_dict = {'id': self.usuario.id, 'name': getattr(self.usuario, 'name', 'N/A')} if hasattr(self.usuario, 'id') else None
             
-            # Constrói o dicionário final do lead.
+            # Constrói o dicionário final do lead, lendo as colunas direto do __dict__ da instância.
             # Usa `or ''` para garantir strings vazias em vez de None para campos opcionais.
             # Formata datas para o padrão ISO 8601.
+            values = loaded_columns(self)
+            criado_em = values.get('criado_em')
+            atualizado_em = values.get('atualizado_em')
             return {
-                'id': self.id,
-                'nome': self.nome,
-                'email': self.email,
-                'telefone': self.telefone or '',
-                'empresa': self.empresa or '',
-                'cargo': self.cargo or '',
-                'interesse': self.interesse or '',
-                'origem': self.origem or '',
-                'status': self.status or 'novo',
-                'observacoes': self.observacoes or '',
-                'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-                'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None,
-                'usuario_id': self.usuario_id,
+                'id': values.get('id'),
+                'nome': values.get('nome'),
+                'email': values.get('email'),
+                'telefone': values.get('telefone') or '',
+                'empresa': values.get('empresa') or '',
+                'cargo': values.get('cargo') or '',
+                'interesse': values.get('interesse') or '',
+                'origem': values.get('origem') or '',
+                'status': values.get('status') or 'novo',
+                'observacoes': values.get('observacoes') or '',
+                'criado_em': criado_em.isoformat() if criado_em else None,
+                'atualizado_em': atualizado_em.isoformat() if atualizado_em else None,
+                'usuario_id': values.get('usuario_id'),
                 'usuario': usuario_dict # Inclui o dicionário do usuário (pode ser None)
             }
         except Exception as e:
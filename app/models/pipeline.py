@@ -1,5 +1,7 @@
 from datetime import datetime
+from sqlalchemy import insert
 from app import db
+from app.utils.queries import loaded_columns
 
 # --- INÍCIO: Adicionar classe Pipeline ---
 class Pipeline(db.Model):
@@ -15,7 +17,9 @@ class Pipeline(db.Model):
     # 'backref' cria um atributo 'pipeline' em PipelineStage
     # 'lazy=dynamic' permite consultas adicionais nos estágios
     # 'cascade' garante que os estágios sejam excluídos se o pipeline for excluído
-    stages = db.relationship('PipelineStage', backref='pipeline', lazy='dynamic', cascade='all, delete-orphan')
+    # 'order_by' devolve os estágios já na ordem de exibição (ordenação feita pelo banco)
+    stages = db.relationship('PipelineStage', backref='pipeline', lazy='dynamic', cascade='all, delete-orphan',
+                             order_by='PipelineStage.order')
     
     # Timestamps de criação e atualização automática
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
@@ -24,17 +28,31 @@ class Pipeline(db.Model):
     def to_dict(self):
         # Converte o objeto Pipeline para um dicionário serializável.
         # Estágios não são incluídos por padrão para evitar consultas desnecessárias.
+        # As colunas são lidas direto do __dict__ da instância (ver loaded_columns).
+        values = loaded_columns(self)
+        criado_em = values.get('criado_em')
+        atualizado_em = values.get('atualizado_em')
         return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'is_default': self.is_default,
-            'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-            'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+            'id': values.get('id'),
+            'name': values.get('name'),
+            'description': values.get('description'),
+            'is_default': values.get('is_default'),
+            'criado_em': criado_em.isoformat() if criado_em else None,
+            'atualizado_em': atualizado_em.isoformat() if atualizado_em else None
             # Não incluir 'stages' aqui por padrão para evitar carga excessiva
         }
 # --- FIM: Adicionar classe Pipeline ---
 
+# Estágios padrão criados para cada novo pipeline (ver PipelineStage.create_default_stages)
+DEFAULT_STAGES = (
+    {'name': 'Prospect', 'order': 1, 'color': '#9E9E9E', 'is_system': True},
+    {'name': 'Qualification', 'order': 2, 'color': '#2196F3', 'is_system': True},
+    {'name': 'Proposal', 'order': 3, 'color': '#FF9800', 'is_system': True},
+    {'name': 'Negotiation', 'order': 4, 'color': '#F44336', 'is_system': True},
+    {'name': 'Closed Won', 'order': 5, 'color': '#4CAF50', 'is_system': True},
+    {'name': 'Closed Lost', 'order': 6, 'color': '#795548', 'is_system': True},
+)
+
 class PipelineStage(db.Model):
     # Modelo para armazenar os estágios de um pipeline de vendas.
 
@@ -56,21 +74,25 @@ class PipelineStage(db.Model):
     
     # Timestamps de criação e atualização automática
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
-    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     def to_dict(self):
         # Converte o objeto PipelineStage para um dicionário serializável.
+        # As colunas são lidas direto do __dict__ da instância (ver loaded_columns).
         try:
+            values = loaded_columns(self)
+            criado_em = values.get('criado_em')
+            atualizado_em = values.get('atualizado_em')
             return {
-                'id': self.id,
-                'name': self.name,
-                'description': self.description or '', # Retorna string vazia se a descrição for None
-                'order': self.order,
-                'color': self.color,
-                'pipeline_id': self.pipeline_id, # Inclui o ID do pipeline pai
-                'is_system': self.is_system,
-                'criado_em': self.criado_em.isoformat() if self.criado_em else None,
-                'atualizado_em': self.atualizado_em.isoformat() if self.atualizado_em else None
+                'id': values.get('id'),
+                'name': values.get('name'),
+                'description': values.get('description') or '', # Retorna string vazia se a descrição for None
+                'order': values.get('order'),
+                'color': values.get('color'),
+                'pipeline_id': values.get('pipeline_id'), # Inclui o ID do pipeline pai
+                'is_system': values.get('is_system'),
+                'criado_em': criado_em.isoformat() if criado_em else None,
+                'atualizado_em': atualizado_em.isoformat() if atualizado_em else None
             }
         except Exception as e:
             # Loga o erro caso a conversão falhe
@@ -102,23 +124,12 @@ class PipelineStage(db.Model):
     @staticmethod
     def create_default_stages(pipeline_id):
         # Cria os estágios padrão para um pipeline específico.
-        # Esta função apenas adiciona os estágios à sessão; o commit deve ser feito externamente.
-        
-        # Define os estágios padrão
-        default_stages = [
-            {'name': 'Prospect', 'order': 1, 'color': '#9E9E9E', 'is_system': True},
-            {'name': 'Qualification', 'order': 2, 'color': '#2196F3', 'is_system': True},
-            {'name': 'Proposal', 'order': 3, 'color': '#FF9800', 'is_system': True},
-            {'name': 'Negotiation', 'order': 4, 'color': '#F44336', 'is_system': True},
-            {'name': 'Closed Won', 'order': 5, 'color': '#4CAF50', 'is_system': True},
-            {'name': 'Closed Lost', 'order': 6, 'color': '#795548', 'is_system': True}
-        ]
-        
-        # Itera sobre os dados e cria as instâncias PipelineStage
-        for stage_data in default_stages:
-            stage = PipelineStage(**stage_data)
-            stage.pipeline_id = pipeline_id # Associa o estágio ao pipeline correto
-            db.session.add(stage) # Adiciona à sessão do SQLAlchemy
+        # Esta função apenas executa o INSERT na transação atual; o commit deve ser feito externamente.
+        # Os estágios são inseridos em um único INSERT em lote (executemany), sem instanciar objetos.
+        db.session.execute(
+            insert(PipelineStage),
+            [dict(stage_data, pipeline_id=pipeline_id) for stage_data in DEFAULT_STAGES]
+        )
         
         # O commit é intencionalmente omitido aqui para permitir que seja feito
         # como parte de uma transação maior (ex: ao criar o pipeline)
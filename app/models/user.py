@@ -3,10 +3,36 @@ Módulo que define o modelo de Usuário para o sistema CRM.
 
 Este modelo gerencia autenticação, autorização e informações dos usuários.
 """
+from collections import OrderedDict
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+import hashlib
+import hmac
+import os
+import threading
+import time
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from werkzeug.security import check_password_hash
 from flask_jwt_extended import create_access_token
 from app import db
+from app.utils.serialization import dumps
+
+
+# Hasher de senhas (argon2id). Hashes antigos gerados pelo werkzeug continuam aceitos
+# e são convertidos para argon2id no primeiro login bem-sucedido.
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=19456, parallelism=2)
+
+
+# Cache (LRU com TTL) de verificações de senha bem-sucedidas recentes.
+# Evita repetir a derivação de chave (cara em CPU) em logins repetidos do mesmo usuário.
+# A chave é (id do usuário, HMAC da senha com um pepper aleatório do processo), de modo
+# que a senha em texto plano nunca fica em memória; o valor guarda o hash vigente, o que
+# invalida a entrada automaticamente quando a senha é alterada.
+_VERIFIED_PASSWORD_TTL = 300  # segundos
+_VERIFIED_PASSWORD_MAXSIZE = 1024
+_verified_password_pepper = os.urandom(32)
+_verified_passwords = OrderedDict()
+_verified_passwords_lock = threading.Lock()
 
 
 class User(db.Model):
@@ -75,7 +101,7 @@ class User(db.Model):
         # 
         # Args:
         #     password (str): A senha em texto plano a ser hasheada.
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = _password_hasher.hash(password)
         
     def verify_password(self, password):
         # Verifica se a senha fornecida (em texto plano) corresponde ao hash armazenado.
@@ -85,7 +111,51 @@ class User(db.Model):
         #     
         # Returns:
         #     bool: True se a senha corresponder ao hash, False caso contrário.
-        return check_password_hash(self.password_hash, password)
+        key = (self.id, hmac.new(_verified_password_pepper, password.encode('utf-8'), hashlib.sha256).digest())
+        now = time.monotonic()
+        
+        with _verified_passwords_lock:
+            entry = _verified_passwords.get(key)
+            if entry is not None:
+                if entry[0] == self.password_hash and entry[1] > now:
+                    _verified_passwords.move_to_end(key)
+                    return True
+                # Entrada expirada ou de uma senha anterior
+                del _verified_passwords[key]
+        
+        if not self._check_password_hash(password):
+            return False
+        
+        # Apenas verificações bem-sucedidas de usuários persistidos são armazenadas.
+        if self.id is not None:
+            with _verified_passwords_lock:
+                _verified_passwords[key] = (self.password_hash, now + _VERIFIED_PASSWORD_TTL)
+                _verified_passwords.move_to_end(key)
+                while len(_verified_passwords) > _VERIFIED_PASSWORD_MAXSIZE:
+                    _verified_passwords.popitem(last=False)
+        return True
+    
+    def _check_password_hash(self, password):
+        # Verifica a senha contra o hash armazenado (argon2id ou hash legado do werkzeug).
+        # Se o hash for legado ou usar parâmetros desatualizados, a senha é re-hasheada;
+        # cabe ao chamador persistir a alteração (o usuário fica 'dirty' na sessão).
+        # 
+        # Returns:
+        #     bool: True se a senha corresponder ao hash, False caso contrário.
+        if self.password_hash.startswith('$argon2'):
+            try:
+                _password_hasher.verify(self.password_hash, password)
+            except (VerificationError, InvalidHashError):
+                return False
+            if _password_hasher.check_needs_rehash(self.password_hash):
+                self.password = password
+            return True
+        
+        # Hash legado (werkzeug): verifica e converte para argon2id
+        if not check_password_hash(self.password_hash, password):
+            return False
+        self.password = password
+        return True
     
     def generate_token(self):
         # Gera um token de acesso JWT (JSON Web Token) para este usuário.
@@ -120,9 +190,17 @@ class User(db.Model):
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') # Formata a data para string
         }
     
+    def to_json(self):
+        # Retorna to_dict() já serializado em JSON (bytes), para compor respostas pré-serializadas.
+        # 
+        # Returns:
+        #     bytes: JSON com os atributos públicos do usuário.
+        return dumps(self.to_dict())
+    
     def __repr__(self):
         # Retorna uma representação textual do objeto User, útil para logs e depuração.
         # 
         # Returns:
         #     str: String representando o usuário.
         return f'<User {self.username}>'
+
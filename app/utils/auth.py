@@ -0,0 +1,15 @@
+"""
+Helpers de autenticação usados pelas rotas protegidas por JWT.
+"""
+
+from flask_jwt_extended import get_jwt
+
+
+def get_caller():
+    # Retorna a identidade e o papel do usuário autenticado a partir das claims do JWT.
+    # Equivale a get_jwt_identity() + get_jwt().get('role'), com um único acesso às claims.
+    # 
+    # Returns:
+    #     tuple: (ID do usuário como string, papel do usuário ou '').
+    claims = get_jwt()
+    return claims.get('sub'), claims.get('role', '')
@@ -0,0 +1,65 @@
+"""
+Cache em memória (por processo) com TTL e tamanho limitado, usado pelos módulos cache.py da API.
+
+Cada entrada expira ttl segundos após ser gravada; acima de max_entries, as entradas
+menos usadas são descartadas (LRU). Alterações feitas em outros processos só são vistas
+após a expiração ou quando a chave inclui a versão dos dados (ex: maior atualizado_em).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Dicionário thread-safe com expiração por entrada e descarte LRU.
+
+    Args:
+        ttl: Tempo de vida de cada entrada, em segundos
+        max_entries: Quantidade máxima de entradas (None para ilimitado)
+    """
+
+    def __init__(self, ttl, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        # Retorna o valor em cache para a chave, ou default se ausente/expirado.
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= now:
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        # Guarda o valor para a chave, descartando as entradas menos usadas acima do limite.
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if self.max_entries is not None:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def get_or_set(self, key, build):
+        # Retorna o valor em cache, ou o gera com build() (sem argumentos) e o guarda.
+        # Valores None também ficam em cache.
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = build()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        # Descarta todas as entradas.
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,98 @@
+"""
+Middleware WSGI de compressão gzip das respostas JSON das rotas /api/*.
+
+Só as respostas application/json a partir de um tamanho mínimo são comprimidas, e
+apenas quando o cliente aceita gzip (Accept-Encoding, com q-value > 0). Downloads de arquivos
+(send_file) e respostas já codificadas passam sem alteração.
+"""
+
+import gzip
+
+from werkzeug.http import parse_accept_header
+
+COMPRESS_MIMETYPES = frozenset(('application/json',))
+
+
+class GzipMiddleware:
+    """
+    Comprime com gzip as respostas JSON de caminhos com o prefixo informado.
+
+    Args:
+        wsgi_app: Aplicação WSGI envolvida (normalmente app.wsgi_app)
+        level: Nível de compressão do gzip (1-9)
+        min_size: Tamanho mínimo do corpo, em bytes, para comprimir
+        path_prefix: Prefixo dos caminhos comprimidos (padrão: '/api/')
+    """
+
+    def __init__(self, wsgi_app, level=6, min_size=500, path_prefix='/api/'):
+        self.wsgi_app = wsgi_app
+        self.level = level
+        self.min_size = min_size
+        self.path_prefix = path_prefix
+
+    def __call__(self, environ, start_response):
+        if (environ.get('REQUEST_METHOD') == 'HEAD'
+                or not environ.get('PATH_INFO', '').startswith(self.path_prefix)
+                or not _accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING'))):
+            return self.wsgi_app(environ, start_response)
+
+        captured = []  # [status, headers, exc_info] quando a resposta é comprimível
+        buffer = []
+
+        def gzip_start_response(status, headers, exc_info=None):
+            if not _is_compressible(headers):
+                captured.clear()
+                return start_response(status, headers, exc_info)
+            captured[:] = [status, list(headers), exc_info]
+            return buffer.append
+
+        app_iter = self.wsgi_app(environ, gzip_start_response)
+        if not captured:
+            return app_iter
+
+        try:
+            buffer.extend(app_iter)
+        finally:
+            close = getattr(app_iter, 'close', None)
+            if close is not None:
+                close()
+
+        status, headers, exc_info = captured
+        body = b''.join(buffer)
+        if len(body) >= self.min_size:
+            body = gzip.compress(body, self.level)
+            headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+            headers.append(('Content-Encoding', 'gzip'))
+            headers.append(('Content-Length', str(len(body))))
+            _add_vary_accept_encoding(headers)
+        start_response(status, headers, exc_info)
+        return [body]
+
+
+def _accepts_gzip(accept_encoding):
+    # Indica se o cliente aceita gzip, respeitando os q-values (ex: 'gzip;q=0' recusa).
+    if not accept_encoding:
+        return False
+    return parse_accept_header(accept_encoding).quality('gzip') > 0
+
+
+def _is_compressible(headers):
+    # Apenas JSON sem Content-Encoding definido pela própria rota.
+    mimetype = None
+    for name, value in headers:
+        name = name.lower()
+        if name == 'content-encoding':
+            return False
+        if name == 'content-type':
+            mimetype = value.split(';', 1)[0].strip().lower()
+    return mimetype in COMPRESS_MIMETYPES
+
+
+def _add_vary_accept_encoding(headers):
+    # Acrescenta 'Accept-Encoding' ao cabeçalho Vary existente (ou cria o cabeçalho).
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == 'vary':
+            if 'accept-encoding' not in value.lower():
+                headers[index] = (name, f'{value}, Accept-Encoding')
+            return
+    headers.append(('Vary', 'Accept-Encoding'))
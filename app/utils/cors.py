@@ -0,0 +1,84 @@
+"""
+Middleware WSGI de CORS (Cross-Origin Resource Sharing) para as rotas /api/*.
+
+As origens permitidas ficam em um frozenset e os cabeçalhos de cada origem são
+pré-calculados; requisições preflight são respondidas diretamente pelo middleware,
+sem passar pelo Flask.
+"""
+
+CORS_ALLOW_METHODS = 'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT'
+
+
+class CORSMiddleware:
+    """
+    Adiciona os cabeçalhos CORS às respostas de caminhos com o prefixo informado.
+
+    Args:
+        wsgi_app: Aplicação WSGI envolvida (normalmente app.wsgi_app)
+        origins: Origens permitidas separadas por vírgula ('*' libera qualquer origem)
+        path_prefix: Prefixo dos caminhos que recebem CORS (padrão: '/api/')
+    """
+
+    def __init__(self, wsgi_app, origins='*', path_prefix='/api/'):
+        self.wsgi_app = wsgi_app
+        self.path_prefix = path_prefix
+        self.origins = frozenset(origin.strip() for origin in origins.split(',') if origin.strip())
+        self.allow_any_origin = '*' in self.origins
+        # Cabeçalhos por origem configurada, calculados uma única vez
+        self.origin_headers = {
+            origin: [('Access-Control-Allow-Origin', origin)]
+            for origin in self.origins if origin != '*'
+        }
+        self.wildcard_headers = [('Access-Control-Allow-Origin', '*')]
+
+    def _headers_for(self, origin):
+        # Retorna os cabeçalhos CORS da origem ou None se ela não for permitida.
+        if not origin:
+            return self.wildcard_headers if self.allow_any_origin else None
+        headers = self.origin_headers.get(origin)
+        if headers is None and self.allow_any_origin:
+            headers = [('Access-Control-Allow-Origin', origin)]
+        return headers
+
+    def __call__(self, environ, start_response):
+        if not environ.get('PATH_INFO', '').startswith(self.path_prefix):
+            return self.wsgi_app(environ, start_response)
+
+        origin = environ.get('HTTP_ORIGIN')
+        cors_headers = self._headers_for(origin)
+
+        # Preflight: responde imediatamente, sem executar a aplicação
+        if environ.get('REQUEST_METHOD') == 'OPTIONS' and 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' in environ:
+            headers = [('Content-Length', '0')]
+            if cors_headers is not None:
+                headers.extend(cors_headers)
+                if origin:
+                    headers.append(('Vary', 'Origin'))
+                headers.append(('Access-Control-Allow-Methods', CORS_ALLOW_METHODS))
+                request_headers = environ.get('HTTP_ACCESS_CONTROL_REQUEST_HEADERS')
+                if request_headers:
+                    headers.append(('Access-Control-Allow-Headers', request_headers))
+            start_response('204 No Content', headers)
+            return [b'']
+
+        if cors_headers is None:
+            return self.wsgi_app(environ, start_response)
+
+        def cors_start_response(status, headers, exc_info=None):
+            headers = list(headers)
+            headers.extend(cors_headers)
+            if origin:
+                _add_vary_origin(headers)
+            return start_response(status, headers, exc_info)
+
+        return self.wsgi_app(environ, cors_start_response)
+
+
+def _add_vary_origin(headers):
+    # Acrescenta 'Origin' ao cabeçalho Vary existente (ou cria o cabeçalho).
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == 'vary':
+            if 'origin' not in value.lower():
+                headers[index] = (name, f'{value}, Origin')
+            return
+    headers.append(('Vary', 'Origin'))
@@ -0,0 +1,44 @@
+"""
+Decoradores compartilhados pelas rotas da API.
+"""
+
+import functools
+
+from flask import current_app, jsonify
+from marshmallow import ValidationError
+from werkzeug.exceptions import HTTPException
+
+from app import db
+
+
+def handle_errors(label):
+    # Envolve a rota no tratamento de erros padrão da API.
+    # 
+    # - ValidationError (marshmallow): 400 {'message': 'Erro de validação', 'errors': ...}
+    # - HTTPException (abort, JSON inválido, 415, 413...): repassada ao Flask com o status original
+    # - Qualquer outra exceção: rollback da sessão, log com traceback e
+    #   500 {'error': 'Erro ao <label>', 'details': str(e)}
+    # 
+    # Args:
+    #     label (str): Descrição da operação (ex: 'listar comunicações').
+    error_message = f'Erro ao {label}'
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except ValidationError as err:
+                return jsonify({'message': 'Erro de validação', 'errors': err.messages}), 400
+            except HTTPException:
+                raise
+            except Exception as e:
+                db.session.rollback()
+                # Argumentos da rota (ex: IDs) incluídos no log para facilitar o diagnóstico
+                if kwargs:
+                    current_app.logger.exception("%s %s", error_message, kwargs)
+                else:
+                    current_app.logger.exception(error_message)
+                return jsonify({'error': error_message, 'details': str(e)}), 500
+        return wrapper
+    return decorator
@@ -0,0 +1,117 @@
+"""
+Utilitários de paginação por cursor (keyset/seek pagination).
+
+O cursor identifica a última linha retornada pelo par (valor da coluna de ordenação, id)
+e é enviado ao cliente codificado em base64 (URL-safe). A página seguinte é obtida com
+um filtro "(coluna, id) < (valor, id)", que o banco resolve com uma busca por intervalo
+no índice, sem COUNT(*) nem OFFSET.
+
+As colunas de ordenação aceitam NULL: as linhas sem valor vêm primeiro (DESC NULLS FIRST,
+a ordem padrão do PostgreSQL e a dos índices (coluna DESC, id DESC)) e são percorridas
+pelo id; no cursor, o valor NULL é representado por uma string vazia.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(value, last_id):
+    # Codifica o cursor da próxima página a partir da última linha retornada.
+    # 
+    # Args:
+    #     value (datetime | None): Valor da coluna de ordenação da última linha.
+    #     last_id (int): ID da última linha.
+    # 
+    # Returns:
+    #     str: Cursor em base64 URL-safe.
+    raw = f"{'' if value is None else value.isoformat()}|{last_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    # Decodifica um cursor gerado por encode_cursor.
+    # 
+    # Args:
+    #     cursor (str): Cursor recebido na query string.
+    # 
+    # Returns:
+    #     tuple: (datetime | None, int) da última linha da página anterior.
+    # 
+    # Raises:
+    #     ValueError: Se o cursor for inválido.
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        value, last_id = raw.rsplit('|', 1)
+        return cursor_position(value, last_id)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def cursor_position(value, last_id):
+    # Converte o par (valor ISO 8601, id) recebido do cliente na posição usada por seek_before.
+    # Valor vazio representa uma última linha com a coluna de ordenação NULL.
+    # Lança ValueError se algum dos dois for inválido.
+    return (datetime.fromisoformat(value) if value else None), int(last_id)
+
+
+def cursor_from_args(args, value_param, id_param='after_id'):
+    # Lê da query string a posição da página anterior: o 'cursor' opaco (next_cursor da
+    # resposta anterior) ou o par value_param (ISO 8601) + id_param.
+    # 
+    # Args:
+    #     args: request.args.
+    #     value_param (str): Nome do parâmetro com o valor da coluna de ordenação (ex: 'after_criado_em').
+    #     id_param (str): Nome do parâmetro com o ID da última linha.
+    # 
+    # Returns:
+    #     tuple: (datetime | None, int) como em decode_cursor, ou None na primeira página.
+    #     value_param vazio indica que a última linha não tinha valor na coluna de ordenação.
+    # 
+    # Raises:
+    #     ValueError: Se a posição for inválida ou se apenas um dos parâmetros do par for enviado.
+    cursor = args.get('cursor')
+    if cursor:
+        return decode_cursor(cursor)
+    after_value = args.get(value_param)
+    after_id = args.get(id_param)
+    if after_value is None and after_id is None:
+        return None
+    if after_value is None or not after_id:
+        raise ValueError(f"{value_param} e {id_param} devem ser enviados juntos")
+    return cursor_position(after_value, after_id)
+
+
+def seek_before(column, id_column, cursor):
+    # Retorna o filtro das linhas posteriores ao cursor na ordenação (column DESC NULLS FIRST, id DESC).
+    value, last_id = cursor
+    if value is None:
+        # Ainda no grupo de valores NULL: o restante dele (pelo id) e todas as linhas com valor
+        return or_(and_(column.is_(None), id_column < last_id), column.isnot(None))
+    # Depois do grupo NULL: a comparação "<" já exclui as linhas NULL (que vieram antes)
+    return or_(column < value, and_(column == value, id_column < last_id))
+
+
+def keyset_page(query, column, id_column, per_page, cursor=None):
+    # Executa uma página da consulta ordenada por (column DESC NULLS FIRST, id DESC).
+    # Busca per_page + 1 linhas: a linha extra apenas indica se existe próxima página.
+    # 
+    # Args:
+    #     query: Consulta já filtrada (sem ordenação).
+    #     column: Coluna de ordenação (datetime, pode ser NULL).
+    #     id_column: Coluna de desempate (chave primária).
+    #     per_page (int): Quantidade de itens por página.
+    #     cursor (tuple, optional): Resultado de decode_cursor da página anterior.
+    # 
+    # Returns:
+    #     tuple: (itens da página, cursor da próxima página ou None).
+    if cursor is not None:
+        query = query.filter(seek_before(column, id_column, cursor))
+    rows = query.order_by(column.desc().nulls_first(), id_column.desc()).limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, column.key), getattr(last, id_column.key))
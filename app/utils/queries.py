@@ -0,0 +1,62 @@
+"""
+Helpers de consulta reutilizados pelas rotas da API.
+"""
+
+from sqlalchemy import inspect
+
+from app import db
+
+# Tamanho máximo do termo de busca textual (ILIKE); termos longos geram muitos
+# trigramas e tornam a consulta ao índice pg_trgm desnecessariamente cara.
+MAX_SEARCH_LENGTH = 64
+
+
+def record_exists(model, *criteria, **filters):
+    # Verifica se existe ao menos um registro que satisfaça os filtros, com SELECT EXISTS(...).
+    # Não carrega nem instancia o objeto do modelo, ao contrário de Model.query.get/first().
+    # 
+    # Args:
+    #     model: Classe do modelo SQLAlchemy.
+    #     *criteria: Expressões de filtro (ex: Model.id != 1).
+    #     **filters: Filtros por igualdade (ex: id=1, name='x').
+    # 
+    # Returns:
+    #     bool: True se existir ao menos um registro.
+    query = model.query.filter_by(**filters)
+    if criteria:
+        query = query.filter(*criteria)
+    return db.session.query(query.exists()).scalar()
+
+
+def search_pattern(term, anchored=False):
+    # Monta o padrão '%termo%' para buscas ILIKE, limitando o tamanho do termo.
+    # 
+    # Args:
+    #     term (str): Termo de busca recebido na query string.
+    #     anchored (bool): Se True, monta 'termo%' (busca por prefixo).
+    # 
+    # Returns:
+    #     str: Padrão para uso com Column.ilike()/like().
+    term = term.strip()[:MAX_SEARCH_LENGTH]
+    return f"{term}%" if anchored else f"%{term}%"
+
+
+def loaded_columns(instance):
+    # Retorna o __dict__ da instância com as colunas carregadas, para leitura direta dos valores
+    # (sem passar pelos descritores do SQLAlchemy a cada campo, como em to_dict()).
+    # Colunas ainda não carregadas (expiradas após um commit, adiadas por load_only/defer) são
+    # carregadas antes pelo próprio descritor: as expiradas em um único SELECT.
+    # 
+    # Args:
+    #     instance: Objeto de um modelo SQLAlchemy.
+    # 
+    # Returns:
+    #     dict: Valores por nome de atributo (colunas nunca definidas em objetos novos ficam ausentes).
+    state = inspect(instance)
+    unloaded = state.unloaded
+    if unloaded:
+        values = state.dict
+        for key in state.mapper.column_attrs.keys():
+            if key in unloaded and key not in values:
+                getattr(instance, key)
+    return state.dict
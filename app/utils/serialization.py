@@ -0,0 +1,72 @@
+"""
+Serialização JSON da aplicação usando orjson.
+
+Fornece o ORJSONProvider (usado por jsonify/request.get_json em toda a aplicação)
+e o helper ojsonify, que cria a Response JSON diretamente a partir de um objeto.
+"""
+
+import decimal
+
+import orjson
+from flask import Response, request
+from flask.json.provider import JSONProvider
+
+# Permite dicionários com chaves não-string (ex: IDs inteiros), como o json da stdlib
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj):
+    # Converte tipos não suportados nativamente pelo orjson.
+    # datetime, date, UUID e dataclasses já são tratados pelo próprio orjson.
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if hasattr(obj, '__html__'):
+        return str(obj.__html__())
+    raise TypeError(f"Objeto do tipo {type(obj).__name__} não é serializável em JSON")
+
+
+def dumps(obj):
+    # Serializa o objeto para JSON em bytes.
+    return orjson.dumps(obj, default=_default, option=ORJSON_OPTIONS)
+
+
+def ojsonify(obj, status=200):
+    # Cria uma Response JSON serializada com orjson.
+    # 
+    # Args:
+    #     obj: Objeto serializável (dict, list, ...).
+    #     status (int): Código HTTP da resposta (padrão: 200).
+    # 
+    # Returns:
+    #     Response: Resposta com mimetype application/json.
+    return Response(dumps(obj), status=status, mimetype='application/json')
+
+
+def get_json_body():
+    # Lê o corpo JSON da requisição com orjson, sem manter os bytes em cache no request.
+    # Corpo vazio ou JSON inválido resultam em {} (a validação de cada rota reporta os campos ausentes).
+    # Como o corpo não fica em cache, request.json não deve ser usado depois desta chamada.
+    # 
+    # Returns:
+    #     Objeto JSON decodificado, ou {} se o corpo estiver vazio/inválido.
+    raw = request.get_data(cache=False)
+    if not raw:
+        return {}
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return {}
+
+
+class ORJSONProvider(JSONProvider):
+    """Provedor JSON do Flask baseado em orjson"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype='application/json')
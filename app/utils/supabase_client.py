@@ -13,10 +13,16 @@ import logging
 # Configura um logger específico para este módulo
 logger = logging.getLogger(__name__)
 
+# Upload multipart (API compatível com S3 do Supabase Storage): arquivos a partir deste
+# tamanho são enviados em partes, várias ao mesmo tempo
+MULTIPART_PART_SIZE = 8 * 1024 * 1024  # bytes
+MULTIPART_CONCURRENCY = 8
+
 class SupabaseManager:
     # Gerencia a conexão e interação com a API do Supabase usando o padrão Singleton.
     _instance = None # Armazena a única instância da classe
     _client = None # Armazena o cliente Supabase inicializado
+    _s3_client = None # Cliente S3 (boto3) do Storage, criado no primeiro upload multipart
     
     def __new__(cls):
         # Implementa o padrão Singleton.
@@ -108,6 +114,71 @@ class SupabaseManager:
             logger.error(f"Erro durante o upload do arquivo '{file_path}' para '{destination_path}' no Supabase: {str(e)}", exc_info=True)
             return None
     
+    def _get_s3_client(self):
+        # Retorna o cliente boto3 da API compatível com S3 do Supabase Storage, ou None se
+        # as credenciais S3 (SUPABASE_S3_ENDPOINT, SUPABASE_S3_ACCESS_KEY_ID,
+        # SUPABASE_S3_SECRET_ACCESS_KEY) não estiverem configuradas.
+        # O boto3 só é importado aqui, pois é necessário apenas quando o S3 está configurado.
+        if self._s3_client is not None:
+            return self._s3_client
+        endpoint = os.environ.get('SUPABASE_S3_ENDPOINT')
+        access_key = os.environ.get('SUPABASE_S3_ACCESS_KEY_ID')
+        secret_key = os.environ.get('SUPABASE_S3_SECRET_ACCESS_KEY')
+        if not endpoint or not access_key or not secret_key:
+            return None
+        try:
+            import boto3
+            self._s3_client = boto3.client(
+                's3',
+                endpoint_url=endpoint,
+                region_name=os.environ.get('SUPABASE_S3_REGION', 'us-east-1'),
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key
+            )
+        except Exception as e:
+            logger.error(f"Erro ao inicializar o cliente S3 do Supabase Storage: {str(e)}", exc_info=True)
+            return None
+        return self._s3_client
+
+    def upload_file_multipart(self, file_path, destination_path, bucket_name='documents',
+                              part_size=MULTIPART_PART_SIZE, concurrency=MULTIPART_CONCURRENCY):
+        # Faz upload de um arquivo local para o Supabase Storage em partes enviadas em paralelo
+        # (CreateMultipartUpload/UploadPart/CompleteMultipartUpload da API S3, via boto3).
+        # Arquivos menores que part_size, ou sem credenciais S3 configuradas, usam upload_file.
+        # 
+        # Args:
+        #     file_path (str): Caminho completo do arquivo local a ser enviado.
+        #     destination_path (str): Caminho/nome do arquivo como será salvo no bucket.
+        #     bucket_name (str): Nome do bucket de destino (padrão: 'documents').
+        #     part_size (int): Tamanho de cada parte, em bytes.
+        #     concurrency (int): Quantidade de partes enviadas ao mesmo tempo.
+        # 
+        # Returns:
+        #     dict: Resposta do upload em caso de sucesso, ou None em caso de erro.
+        try:
+            file_size = os.path.getsize(file_path)
+        except OSError:
+            logger.error(f"Arquivo local não encontrado para upload: {file_path}")
+            return None
+        
+        s3 = self._get_s3_client() if file_size >= part_size else None
+        if s3 is None:
+            return self.upload_file(file_path, destination_path, bucket_name)
+        
+        try:
+            from boto3.s3.transfer import TransferConfig
+            config = TransferConfig(
+                multipart_threshold=part_size,
+                multipart_chunksize=part_size,
+                max_concurrency=concurrency
+            )
+            s3.upload_file(file_path, bucket_name, destination_path, Config=config)
+            logger.info(f"Upload multipart para Supabase concluído: {destination_path} no bucket {bucket_name}")
+            return {'Key': destination_path}
+        except Exception as e:
+            logger.error(f"Erro durante o upload multipart do arquivo '{file_path}' para '{destination_path}' no Supabase: {str(e)}", exc_info=True)
+            return None
+    
     def download_file(self, file_path, bucket_name='documents') -> bytes | None:
         # Baixa um arquivo do Supabase Storage.
         # 
@@ -154,6 +225,28 @@ class SupabaseManager:
             logger.error(f"Erro ao obter URL pública para '{file_path}': {str(e)}", exc_info=True)
             return None
 
+    def create_signed_url(self, file_path, bucket_name='documents', expires_in=300) -> str | None:
+        # Gera uma URL assinada, válida por pouco tempo, para baixar um arquivo do Supabase Storage
+        # (funciona também em buckets privados).
+        # 
+        # Args:
+        #     file_path (str): Caminho/nome do arquivo no bucket.
+        #     bucket_name (str): Nome do bucket (padrão: 'documents').
+        #     expires_in (int): Validade da URL, em segundos (padrão: 300).
+        # 
+        # Returns:
+        #     str: A URL assinada, ou None em caso de erro.
+        storage = self.get_storage(bucket_name)
+        if not storage:
+            return None
+            
+        try:
+            result = storage.create_signed_url(file_path, expires_in)
+            return result.get('signedURL') or result.get('signedUrl')
+        except Exception as e:
+            logger.error(f"Erro ao gerar URL assinada para '{file_path}': {str(e)}", exc_info=True)
+            return None
+
 # Função auxiliar para simplificar a obtenção da instância do cliente Supabase
 def get_supabase_client() -> Client | None:
     # Retorna a instância do cliente Supabase gerenciada pelo Singleton.
@@ -0,0 +1,105 @@
+"""
+Utilitários para o diretório de uploads locais.
+
+Os subdiretórios de upload (documents, communications) são criados sob demanda,
+no primeiro upload, em vez de a cada inicialização da aplicação.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos blocos lidos do upload e do buffer de escrita em disco (1 MiB)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Thread (por processo) que remove os arquivos de registros excluídos, fora da thread da requisição.
+# As remoções pendentes são concluídas antes de o processo terminar.
+_deletion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='upload-delete')
+
+
+def get_upload_dir(subfolder):
+    # Retorna o caminho do subdiretório de uploads, criando-o se necessário.
+    # 
+    # Args:
+    #     subfolder (str): Nome do subdiretório (ex: 'documents', 'communications').
+    # 
+    # Returns:
+    #     str: Caminho completo do subdiretório dentro de UPLOAD_FOLDER.
+    return _ensure_dir(current_app.config.get('UPLOAD_FOLDER', 'uploads'), subfolder)
+
+
+@lru_cache(maxsize=None)
+def _ensure_dir(upload_folder, subfolder):
+    # Monta o caminho e cria o diretório uma única vez por processo (por pasta de upload);
+    # chamadas seguintes não fazem syscalls nem os.path.join.
+    path = os.path.join(upload_folder, subfolder)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def save_upload(file, file_path, chunk_size=UPLOAD_CHUNK_SIZE, hasher=None):
+    # Grava o arquivo enviado em disco em blocos grandes, contando os bytes escritos.
+    # Dispensa o os.path.getsize() após a gravação.
+    # 
+    # Args:
+    #     file (FileStorage): Arquivo recebido em request.files.
+    #     file_path (str): Caminho de destino.
+    #     chunk_size (int): Tamanho dos blocos de leitura/escrita.
+    #     hasher (optional): Objeto hashlib atualizado com cada bloco gravado.
+    # 
+    # Returns:
+    #     int: Tamanho do arquivo gravado, em bytes.
+    return save_stream(file.stream, file_path, chunk_size, hasher)
+
+
+def save_stream(stream, file_path, chunk_size=UPLOAD_CHUNK_SIZE, hasher=None):
+    # Grava em disco, em blocos, o conteúdo de um stream (ex: request.stream), contando os bytes escritos.
+    # Se hasher for informado (ex: hashlib.sha256()), o hash é calculado na mesma passada,
+    # sem reler o arquivo.
+    # 
+    # Args:
+    #     stream: Objeto com read(n), como request.stream ou FileStorage.stream.
+    #     file_path (str): Caminho de destino.
+    #     chunk_size (int): Tamanho dos blocos de leitura/escrita.
+    #     hasher (optional): Objeto hashlib atualizado com cada bloco gravado.
+    # 
+    # Returns:
+    #     int: Tamanho do arquivo gravado, em bytes.
+    size = 0
+    with open(file_path, 'wb', buffering=chunk_size) as out:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            out.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            size += len(chunk)
+    return size
+
+
+def delete_files_later(file_paths):
+    # Agenda a remoção dos arquivos em segundo plano, para que a resposta não espere o disco.
+    # Chamar somente após o commit que removeu os registros correspondentes.
+    # 
+    # Args:
+    #     file_paths (list): Caminhos dos arquivos a remover (arquivos ausentes são ignorados).
+    file_paths = [path for path in file_paths if path]
+    if file_paths:
+        _deletion_executor.submit(_delete_files, file_paths)
+
+
+def _delete_files(file_paths):
+    # Executado na thread de remoção (sem contexto da aplicação: usa o logger do módulo).
+    for path in file_paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Erro ao excluir arquivo {path}: {str(e)}")
@@ -0,0 +1,116 @@
+"""
+Carga rápida de payloads JSON validados por schemas marshmallow simples.
+
+O FastLoader "compila" os campos declarados de um Schema em uma lista de regras
+(tipos aceitos, conversão e validadores) e valida o payload diretamente, sem o
+processamento genérico de Schema.load. Qualquer payload fora do caminho rápido
+(chave desconhecida sem unknown=EXCLUDE, tipo inesperado, campo obrigatório ausente,
+falha de validação) é repassado ao próprio Schema.load, que produz o mesmo resultado
+e as mensagens de erro de sempre. Assim, o resultado é sempre equivalente ao do marshmallow.
+"""
+
+import math
+import re
+from datetime import date
+
+from marshmallow import EXCLUDE, ValidationError, fields
+
+# Datas no formato YYYY-MM-DD (o formato ISO aceito por fields.Date)
+_DATE_RE = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def _to_date(value):
+    if not _DATE_RE.match(value):
+        raise ValueError(value)
+    return date.fromisoformat(value)
+
+
+def _to_float(value):
+    # fields.Float rejeita NaN e infinito por padrão
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(value)
+    return value
+
+
+# Tipo do campo marshmallow -> (tipos Python aceitos no caminho rápido, conversão)
+_FIELD_RULES = {
+    fields.String: ((str,), None),
+    fields.Email: ((str,), None),  # o validador de email já está em field.validators
+    fields.Integer: ((int,), None),
+    fields.Float: ((int, float), _to_float),
+    fields.Date: ((str,), _to_date),
+}
+
+
+class FastLoader:
+    """Validação rápida equivalente a Schema.load para schemas com campos simples"""
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.partial = schema.partial is True
+        self.exclude_unknown = schema.unknown == EXCLUDE
+        self.rules = self._compile(schema)
+        self.required = frozenset(
+            name for name, field in schema.load_fields.items() if field.required
+        )
+
+    @staticmethod
+    def _compile(schema):
+        # Monta as regras por campo; retorna None (sem caminho rápido) se o schema usar
+        # recursos não suportados (tipos de campo, data_key, hooks de pré/pós-carga).
+        if any(schema._hooks.values()) or schema.many:
+            return None
+        rules = {}
+        for name, field in schema.load_fields.items():
+            rule = _FIELD_RULES.get(type(field))
+            if rule is None or field.data_key not in (None, name):
+                return None
+            types, convert = rule
+            rules[name] = (types, convert, tuple(field.validators), field.allow_none)
+        return rules
+
+    def load(self, payload):
+        # Valida e converte o payload; em caso de erro, lança a mesma ValidationError do schema.
+        #
+        # Args:
+        #     payload (dict): JSON decodificado da requisição.
+        #
+        # Returns:
+        #     dict: Dados validados, como os de Schema.load().
+        data = self._fast_load(payload)
+        if data is None:
+            return self.schema.load(payload)
+        return data
+
+    def _fast_load(self, payload):
+        # Retorna os dados validados, ou None se o payload precisar do caminho completo.
+        rules = self.rules
+        if rules is None or not isinstance(payload, dict):
+            return None
+        if not self.partial and not self.required.issubset(payload):
+            return None
+        data = {}
+        for name, value in payload.items():
+            rule = rules.get(name)
+            if rule is None:
+                if self.exclude_unknown:
+                    continue
+                return None
+            types, convert, validators, allow_none = rule
+            if value is None:
+                if not allow_none:
+                    return None
+                data[name] = None
+                continue
+            if value is True or value is False or not isinstance(value, types):
+                return None
+            try:
+                if convert is not None:
+                    value = convert(value)
+                for validator in validators:
+                    validator(value)
+            except (ValueError, ValidationError):
+                return None
+            data[name] = value
+        return data
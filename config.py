@@ -32,6 +32,14 @@ class Config:
     # URL base para geração de links
     BASE_URL = os.environ.get('BASE_URL', 'http://localhost:5001')
     
+    # Origens permitidas para CORS nas rotas /api/* (separadas por vírgula; '*' libera todas)
+    CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '*')
+    
+    # Compressão gzip das respostas JSON em /api/* (desative se o proxy reverso já comprimir)
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIN_SIZE = 500  # bytes
+    
     # Diretório de uploads
     UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(basedir, 'uploads'))
     
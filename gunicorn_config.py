@@ -12,6 +12,12 @@ worker_class = 'sync'  # Tipo de worker (sync, eventlet, gevent, etc.)
 threads = 2  # Número de threads por worker
 timeout = 60  # Timeout em segundos para processar requisições
 
+# Carrega a aplicação no processo master antes do fork dos workers.
+# O mapa de URLs já compilado em create_app é compartilhado (copy-on-write) pelos workers,
+# que não precisam refazer o registro de blueprints/rotas. create_app não abre conexões
+# com o banco, então o pool do SQLAlchemy começa vazio em cada worker.
+preload_app = True
+
 # Configurações de Logging
 accesslog = '-'  # '-' para stdout
 errorlog = '-'  # '-' para stderr
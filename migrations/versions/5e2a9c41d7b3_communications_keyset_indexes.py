@@ -0,0 +1,28 @@
+"""Communications keyset pagination indexes
+
+Revision ID: 5e2a9c41d7b3
+Revises: 47d6c375dfa0
+Create Date: 2026-10-15 23:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2a9c41d7b3'
+down_revision = '47d6c375dfa0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('communications', schema=None) as batch_op:
+        batch_op.create_index('ix_communications_date_time_id', [sa.text('date_time DESC'), sa.text('id DESC')], unique=False)
+        batch_op.create_index('ix_communications_entity_date_time_id', ['entity_type', 'entity_id', sa.text('date_time DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('communications', schema=None) as batch_op:
+        batch_op.drop_index('ix_communications_entity_date_time_id')
+        batch_op.drop_index('ix_communications_date_time_id')
@@ -0,0 +1,42 @@
+"""Trigram indexes for communications and customers search
+
+Revision ID: 8b1f0d6a2c94
+Revises: 5e2a9c41d7b3
+Create Date: 2026-10-15 23:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1f0d6a2c94'
+down_revision = '5e2a9c41d7b3'
+branch_labels = None
+depends_on = None
+
+
+# (nome do índice, tabela, coluna) - índices GIN de trigramas usados pelas buscas ILIKE '%termo%'
+TRGM_INDEXES = [
+    ('ix_communications_subject_trgm', 'communications', 'subject'),
+    ('ix_communications_content_trgm', 'communications', 'content'),
+    ('ix_customers_name_trgm', 'customers', 'name'),
+    ('ix_customers_email_trgm', 'customers', 'email'),
+    ('ix_customers_company_trgm', 'customers', 'company'),
+]
+
+
+def upgrade():
+    # pg_trgm só existe no PostgreSQL; em outros bancos (ex: SQLite em desenvolvimento) nada é feito
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRGM_INDEXES:
+        op.create_index(name, table, [sa.text(f'{column} gin_trgm_ops')], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, _column in reversed(TRGM_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,40 @@
+"""Trigram indexes for leads filters
+
+Revision ID: a3d7e1f5c9ca
+Revises: f2c6d0e4b8b9
+Create Date: 2026-10-16 01:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d7e1f5c9ca'
+down_revision = 'f2c6d0e4b8b9'
+branch_labels = None
+depends_on = None
+
+
+# (nome do índice, tabela, coluna) - índices GIN de trigramas usados pelos filtros ILIKE '%termo%'
+TRGM_INDEXES = [
+    ('ix_leads_nome_trgm', 'leads', 'nome'),
+    ('ix_leads_email_trgm', 'leads', 'email'),
+    ('ix_leads_empresa_trgm', 'leads', 'empresa'),
+]
+
+
+def upgrade():
+    # pg_trgm só existe no PostgreSQL; em outros bancos (ex: SQLite em desenvolvimento) nada é feito
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRGM_INDEXES:
+        op.create_index(name, table, [sa.text(f'{column} gin_trgm_ops')], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, _column in reversed(TRGM_INDEXES):
+        op.drop_index(name, table_name=table)
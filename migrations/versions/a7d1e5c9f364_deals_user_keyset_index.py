@@ -0,0 +1,26 @@
+"""Deals responsible user keyset pagination index
+
+Revision ID: a7d1e5c9f364
+Revises: f6c0d4b8e253
+Create Date: 2026-10-16 00:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d1e5c9f364'
+down_revision = 'f6c0d4b8e253'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.create_index('ix_deals_usuario_criado_em_id', ['usuario_id', sa.text('criado_em DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.drop_index('ix_deals_usuario_criado_em_id')
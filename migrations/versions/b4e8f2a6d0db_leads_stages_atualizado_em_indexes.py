@@ -0,0 +1,32 @@
+"""Leads and pipeline stages atualizado_em indexes
+
+Revision ID: b4e8f2a6d0db
+Revises: a3d7e1f5c9ca
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e8f2a6d0db'
+down_revision = 'a3d7e1f5c9ca'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_leads_atualizado_em'), ['atualizado_em'], unique=False)
+
+    with op.batch_alter_table('pipeline_stages', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pipeline_stages_atualizado_em'), ['atualizado_em'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pipeline_stages', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pipeline_stages_atualizado_em'))
+
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_leads_atualizado_em'))
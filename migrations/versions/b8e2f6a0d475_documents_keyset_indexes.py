@@ -0,0 +1,28 @@
+"""Documents keyset pagination indexes
+
+Revision ID: b8e2f6a0d475
+Revises: a7d1e5c9f364
+Create Date: 2026-10-16 00:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e2f6a0d475'
+down_revision = 'a7d1e5c9f364'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.create_index('ix_documents_created_at_id', [sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+        batch_op.create_index('ix_documents_entity_created_at_id', ['entity_type', 'entity_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index('ix_documents_entity_created_at_id')
+        batch_op.drop_index('ix_documents_created_at_id')
@@ -0,0 +1,26 @@
+"""Deals keyset pagination index
+
+Revision ID: c3f7a1e5b920
+Revises: 8b1f0d6a2c94
+Create Date: 2026-10-15 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7a1e5b920'
+down_revision = '8b1f0d6a2c94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.create_index('ix_deals_criado_em_id', [sa.text('criado_em DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.drop_index('ix_deals_criado_em_id')
@@ -0,0 +1,26 @@
+"""Documents updated_at index
+
+Revision ID: c9f3a7b1e586
+Revises: b8e2f6a0d475
+Create Date: 2026-10-16 00:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f3a7b1e586'
+down_revision = 'b8e2f6a0d475'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_documents_updated_at'), ['updated_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_documents_updated_at'))
@@ -0,0 +1,28 @@
+"""Documents content SHA-256
+
+Revision ID: d0a4b8c2f697
+Revises: c9f3a7b1e586
+Create Date: 2026-10-16 00:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0a4b8c2f697'
+down_revision = 'c9f3a7b1e586'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documents_content_sha256'), ['content_sha256'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_documents_content_sha256'))
+        batch_op.drop_column('content_sha256')
@@ -0,0 +1,32 @@
+"""Trigram index for deals title search
+
+Revision ID: d4a8b2f6c031
+Revises: c3f7a1e5b920
+Create Date: 2026-10-15 23:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8b2f6c031'
+down_revision = 'c3f7a1e5b920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm só existe no PostgreSQL; em outros bancos (ex: SQLite em desenvolvimento) nada é feito
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Índice de expressão: atende a lower(title) LIKE '%termo%' (e 'termo%') da listagem de negócios
+    op.create_index('ix_deals_title_lower_trgm', 'deals', [sa.text('lower(title) gin_trgm_ops')],
+                    unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_deals_title_lower_trgm', table_name='deals')
@@ -0,0 +1,40 @@
+"""Trigram indexes for documents search
+
+Revision ID: e1b5c9d3a7a8
+Revises: d0a4b8c2f697
+Create Date: 2026-10-16 00:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1b5c9d3a7a8'
+down_revision = 'd0a4b8c2f697'
+branch_labels = None
+depends_on = None
+
+
+# (nome do índice, tabela, coluna) - índices GIN de trigramas usados pelas buscas ILIKE '%termo%'
+TRGM_INDEXES = [
+    ('ix_documents_title_trgm', 'documents', 'title'),
+    ('ix_documents_description_trgm', 'documents', 'description'),
+    ('ix_documents_original_filename_trgm', 'documents', 'original_filename'),
+]
+
+
+def upgrade():
+    # pg_trgm só existe no PostgreSQL; em outros bancos (ex: SQLite em desenvolvimento) nada é feito
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRGM_INDEXES:
+        op.create_index(name, table, [sa.text(f'{column} gin_trgm_ops')], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, _column in reversed(TRGM_INDEXES):
+        op.drop_index(name, table_name=table)
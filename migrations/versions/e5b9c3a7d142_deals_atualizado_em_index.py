@@ -0,0 +1,26 @@
+"""Deals atualizado_em index
+
+Revision ID: e5b9c3a7d142
+Revises: d4a8b2f6c031
+Create Date: 2026-10-15 23:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b9c3a7d142'
+down_revision = 'd4a8b2f6c031'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_deals_atualizado_em'), ['atualizado_em'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_deals_atualizado_em'))
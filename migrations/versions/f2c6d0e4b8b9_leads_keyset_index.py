@@ -0,0 +1,26 @@
+"""Leads keyset pagination index
+
+Revision ID: f2c6d0e4b8b9
+Revises: e1b5c9d3a7a8
+Create Date: 2026-10-16 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c6d0e4b8b9'
+down_revision = 'e1b5c9d3a7a8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.create_index('ix_leads_criado_em_id', [sa.text('criado_em DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('leads', schema=None) as batch_op:
+        batch_op.drop_index('ix_leads_criado_em_id')
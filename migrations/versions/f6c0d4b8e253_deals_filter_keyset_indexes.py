@@ -0,0 +1,28 @@
+"""Deals stage/status keyset pagination indexes
+
+Revision ID: f6c0d4b8e253
+Revises: e5b9c3a7d142
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c0d4b8e253'
+down_revision = 'e5b9c3a7d142'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.create_index('ix_deals_stage_criado_em_id', ['pipeline_stage_id', sa.text('criado_em DESC'), sa.text('id DESC')], unique=False)
+        batch_op.create_index('ix_deals_status_criado_em_id', ['status', sa.text('criado_em DESC'), sa.text('id DESC')], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('deals', schema=None) as batch_op:
+        batch_op.drop_index('ix_deals_status_criado_em_id')
+        batch_op.drop_index('ix_deals_stage_criado_em_id')